@@ -4,7 +4,7 @@ from pydantic import BaseModel, EmailStr
 
 from dependencies import get_db
 from crud.user import get_admin_by_email
-from utils.security import verify_password, create_access_token
+from utils.security import PasswordPoolBusy, verify_password_async, create_access_token
 
 router = APIRouter(prefix="/auth/admin", tags=["auth"])
 
@@ -22,7 +22,15 @@ async def admin_login(payload: AdminLoginRequest, db = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    if not verify_password(payload.password, user.get("password_hash", "")):
+    try:
+        password_ok = await verify_password_async(payload.password, user.get("password_hash", ""))
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+    if not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     token = create_access_token({"id": str(user["_id"]), "role": "admin", "type": "access"})
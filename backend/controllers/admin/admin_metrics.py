@@ -3,6 +3,13 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timedelta
 from typing import Optional
 from dependencies import get_db
+from utils.sl_weather import weather_stats
+from utils.security import password_pool_stats, token_cache_stats
+from utils.token_revocation import revocation_stats
+from utils.db_monitor import command_listener
+from models import indexes
+from crud import inventory
+from core.config import settings
 
 router = APIRouter(prefix="/admin/metrics", tags=["admin: metrics"])
 
@@ -28,7 +35,7 @@ async def summary(
     """
     Returns a compact dashboard summary:
       - active_rentals: number of currently active rentals
-      - umbrellas_available: current umbrellas with status='available'
+      - umbrellas_available: current umbrellas with status='available' (from the inventory counters)
       - revenue: (sum of rental fee over range) / 2
     Range is [date_from, date_to] (inclusive) interpreted as UTC, implemented as [start, end) half-open.
     """
@@ -43,6 +50,12 @@ async def summary(
         if end <= start:
             raise HTTPException(status_code=400, detail="date_to must be on/after date_from")
 
+    # --- Fleet counts by status (one counter document, not a scan of umbrellas) ---
+    try:
+        fleet = (await inventory.get_fleet_inventory(db))["counts"]
+    except Exception:
+        fleet = {}
+
     # --- Active rentals (prefer 'rentals', else fallback to umbrellas.status='rented') ---
     active_rentals = 0
     try:
@@ -50,16 +63,10 @@ async def summary(
     except Exception:
         pass
     if active_rentals == 0:
-        try:
-            active_rentals = await db["umbrellas"].count_documents({"status": "rented"})
-        except Exception:
-            active_rentals = 0
+        active_rentals = fleet.get("rented", 0)
 
     # --- Umbrellas available (point-in-time) ---
-    try:
-        umbrellas_available = await db["umbrellas"].count_documents({"status": "available"})
-    except Exception:
-        umbrellas_available = 0
+    umbrellas_available = fleet.get("available", 0)
 
     # --- Earnings from rentals: sum(fee)/2 within [start, end) using rented_at ---
     revenue = 0.0
@@ -83,4 +90,59 @@ async def summary(
         "revenue": round(revenue, 2),  
         "date_from": start.isoformat() + "Z",
         "date_to":   (end - timedelta(milliseconds=1)).isoformat() + "Z",
-    }
\ No newline at end of file
+    }
+
+@router.get("/inventory")
+async def inventory_counts(
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    vendor_id: Optional[str] = Query(None, description="One vendor; the whole fleet if omitted"),
+):
+    """
+    Umbrella counts by status from the vendor_inventory counters, plus the
+    last reconcile run on this worker.
+    """
+    counts = await (inventory.get_vendor_inventory(db, vendor_id) if vendor_id else inventory.get_fleet_inventory(db))
+    return {**counts, "last_reconcile": inventory.LAST_RECONCILE}
+
+@router.post("/inventory/reconcile")
+async def reconcile_inventory(db: AsyncIOMotorDatabase = Depends(get_db)):
+    """
+    Recount umbrellas per vendor and status now and correct any counter that
+    drifted (also runs at startup and every inventory_reconcile_seconds).
+    """
+    return await inventory.reconcile(db)
+
+@router.get("/weather")
+async def weather_cache_stats():
+    """
+    In-process weather cache counters for this worker:
+    hits, misses, coalesced waits on an in-flight fetch, and upstream latency.
+    """
+    return weather_stats()
+
+@router.get("/auth")
+async def auth_stats():
+    """
+    Per-worker auth counters: password hashing pool (hash time, queue depth,
+    rejections), the verified-token cache and the refresh-token revocation set.
+    """
+    return {
+        "password_pool": password_pool_stats(),
+        "token_cache": token_cache_stats(),
+        "refresh_revocations": revocation_stats(),
+    }
+
+@router.get("/db")
+async def db_stats(reset: bool = Query(False, description="Zero the counters after reading")):
+    """
+    Per-route Mongo command stats for this worker: requests, commands, total time and
+    documents returned (overall and per command). A high commands_per_request points at
+    an N+1; high docs_returned per request at a missing index or projection.
+    Commands slower than slow_query_ms are logged with their filter shape.
+    """
+    return {
+        "enabled": settings.db_monitoring_enabled,
+        "slow_query_ms": settings.db_slow_query_ms,
+        "routes": command_listener.snapshot(reset=reset),
+        "indexes": {k: v for k, v in indexes.LAST_REPORT.items() if k != "details"},
+    }
@@ -3,11 +3,13 @@ from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Optional, List
 from dependencies import get_db
-from schemas.admin.umbrellas import CreateUmbrella, UpdateUmbrella, UmbrellaOut, BulkAddUmbrellas
+from schemas.admin.umbrellas import CreateUmbrella, UpdateUmbrella, UmbrellaOut, BulkAddUmbrellas, ProvisionUmbrellas
 from models import umbrella as model
 import io, zipfile
 from utils.qr import generate_qr_png
 from utils.vendors import get_vendor_doc_or_raise
+from utils.pagination import TotalMode
+from utils.fast_json import FastJSONResponse, dumps
 from bson import ObjectId
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
@@ -40,6 +42,26 @@ async def bulk_add_umbrellas(payload: BulkAddUmbrellas, db: AsyncIOMotorDatabase
     except Exception:
         raise HTTPException(status_code=400, detail="Bulk add failed")
 
+@router.post("/provision", status_code=201)
+async def provision_umbrellas(payload: ProvisionUmbrellas, db: AsyncIOMotorDatabase = Depends(get_db)):
+    """
+    Provision up to 100k umbrellas across many vendors in one call.
+    Vendors are validated up front (400); progress then streams as NDJSON:
+    a "start" line, one "chunk" line per inserted chunk (with the new ids and
+    codes), and a final "done" line, or an "error" line if a chunk failed.
+    """
+    orders = [o.model_dump() for o in payload.orders]
+    try:
+        vendors = await model.resolve_vendors(db, [o["vendor_id"] for o in orders])
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    async def lines():
+        async for event in model.provision(db, orders, vendors, chunk_size=payload.chunk_size):
+            yield dumps(event) + b"\n"
+
+    return StreamingResponse(lines(), status_code=201, media_type="application/x-ndjson")
+
 @router.get("", response_model=dict)
 async def list_umbrellas(
     db: AsyncIOMotorDatabase = Depends(get_db),
@@ -48,9 +70,19 @@ async def list_umbrellas(
     q: Optional[str] = None,
     status: Optional[str] = None,
     vendor_id: Optional[str] = None,
+    sort: str = "-created_at",
+    after: Optional[str] = Query(None, description="Cursor mode: '' for the first page, then the previous next_after"),
+    total_mode: TotalMode = "estimate",
 ):
-    items, total = await model.list_paged(db, page, page_size, q, status, vendor_id)
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+    try:
+        items, total, next_after = await model.list_paged(
+            db, page, page_size, q, status, vendor_id, sort=sort, after=after, total_mode=total_mode
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return FastJSONResponse(
+        {"items": items, "total": total, "page": page, "page_size": page_size, "next_after": next_after}
+    )
 
 @router.get("/{uid}", response_model=UmbrellaOut)
 async def get_one(uid: str, db: AsyncIOMotorDatabase = Depends(get_db)):
@@ -3,13 +3,21 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from dependencies import get_db
+from crud.rentals import invalidate_renter_cache
 from typing import Optional, Dict, Any, List
 from bson import ObjectId
 import io, csv
+from utils.fast_json import FastJSONResponse
+from utils.search import USER_SEARCH_FIELDS, search_filter
+from utils.pagination import TotalMode, fetch_page, parse_sort, sort_spec, with_after, next_cursor
 
 router = APIRouter(prefix="/admin/users", tags=["admin-users"])
 
 ALLOWED_STATUSES = {"active", "suspended"} 
+# sort= is limited to fields with a {field, _id} index (see models/indexes.py)
+SORTABLE_FIELDS = {"created_at", "email", "first_name"}
+# exactly what _to_out reads (covers every sortable field, for next_after)
+OUT_PROJECTION = {"first_name": 1, "email": 1, "telephone": 1, "status": 1, "created_at": 1}
 
 def _to_out(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Normalize user document for FE."""
@@ -30,38 +38,34 @@ async def list_users(
     q: Optional[str] = None,              
     status: Optional[str] = None,            
     sort: str = "-created_at",
+    after: Optional[str] = Query(None, description="Cursor mode: '' for the first page, then the previous next_after"),
+    total_mode: TotalMode = "estimate",
 ):
     query: Dict[str, Any] = {
         "role": {"$ne": "admin"}             
     }
 
     if q:
-        query["$or"] = [
-            {"first_name": {"$regex": q, "$options": "i"}},
-            {"email": {"$regex": q, "$options": "i"}},
-            {"telephone": {"$regex": q, "$options": "i"}},
-        ]
+        query.update(search_filter(q, USER_SEARCH_FIELDS))
     if status:
         query["status"] = status
 
-    skip = (page - 1) * page_size
-    sort_field = sort.lstrip("-")
-    sort_dir = -1 if sort.startswith("-") else 1
-
-    cursor = (
-        db.users
-        .find(query)
-        .sort(sort_field, sort_dir)
-        .skip(skip)
-        .limit(page_size)
+    try:
+        sort_field, sort_dir = parse_sort(sort, SORTABLE_FIELDS)
+        find_query = with_after(query, sort_field, sort_dir, after)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    cursor = db.users.find(find_query, OUT_PROJECTION).sort(sort_spec(sort_field, sort_dir))
+    if after is None:
+        cursor = cursor.skip((page - 1) * page_size)
+    docs, total = await fetch_page(
+        cursor.limit(page_size + 1).to_list(length=page_size + 1), db.users, query, total_mode
     )
 
-    items: List[Dict[str, Any]] = []
-    async for u in cursor:
-        items.append(_to_out(u))
+    items: List[Dict[str, Any]] = [_to_out(u) for u in docs[:page_size]]
 
-    total = await db.users.count_documents(query)
-    return {"items": items, "total": total}
+    return FastJSONResponse({"items": items, "total": total, "next_after": next_cursor(docs, page_size, sort_field)})
 
 @router.patch("/{user_id}/status")
 async def update_user_status(
@@ -77,7 +81,7 @@ async def update_user_status(
         raise HTTPException(status_code=400, detail="Invalid user id")
 
     oid = ObjectId(user_id)
-    doc = await db.users.find_one({"_id": oid})
+    doc = await db.users.find_one({"_id": oid}, {"role": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -86,10 +90,11 @@ async def update_user_status(
         raise HTTPException(status_code=403, detail="Cannot change status of admin accounts")
 
     res = await db.users.update_one({"_id": oid}, {"$set": {"status": status}})
+    invalidate_renter_cache(user_id)
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")  # safety
 
-    updated = await db.users.find_one({"_id": oid})
+    updated = await db.users.find_one({"_id": oid}, OUT_PROJECTION)
     return _to_out(updated)
 
 @router.get("/export")
@@ -2,14 +2,24 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from dependencies import get_db
+from dependencies import get_db, invalidate_vendor_cache
 from typing import Optional, Dict, Any, List
 from bson import ObjectId
 import io, csv
+from utils.fast_json import FastJSONResponse
+from utils.search import VENDOR_SEARCH_FIELDS, search_filter
+from utils.pagination import TotalMode, fetch_page, parse_sort, sort_spec, with_after, next_cursor
 
 router = APIRouter(prefix="/admin/vendors", tags=["admin-vendors"])
 
 ALLOWED_STATUSES = {"active", "suspended", "pending"}
+# sort= is limited to fields with a {field, _id} index (see models/indexes.py)
+SORTABLE_FIELDS = {"created_at", "shop_name", "email"}
+# exactly what _to_out reads (covers every sortable field, for next_after)
+OUT_PROJECTION = {
+    "shop_name": 1, "shop_owner_name": 1, "email": 1, "business_reg_no": 1,
+    "telephone": 1, "status": 1, "created_at": 1,
+}
 
 def _to_out(doc: Dict[str, Any]) -> Dict[str, Any]:
     """Normalize vendor document for FE (stringify _id, keep field names)."""
@@ -33,37 +43,33 @@ async def list_vendors(
     status: Optional[str] = None,
     business_reg_no: Optional[str] = None,
     sort: str = "-created_at",
+    after: Optional[str] = Query(None, description="Cursor mode: '' for the first page, then the previous next_after"),
+    total_mode: TotalMode = "estimate",
 ):
     query: Dict[str, Any] = {}
     if q:
-        query["$or"] = [
-            {"shop_name": {"$regex": q, "$options": "i"}},
-            {"shop_owner_name": {"$regex": q, "$options": "i"}},
-            {"email": {"$regex": q, "$options": "i"}},
-        ]
+        query.update(search_filter(q, VENDOR_SEARCH_FIELDS))
     if status:
         query["status"] = status
     if business_reg_no:
         query["business_reg_no"] = {"$regex": business_reg_no, "$options": "i"}
 
-    skip = (page - 1) * page_size
-    sort_field = sort.lstrip("-")
-    sort_dir = -1 if sort.startswith("-") else 1
+    try:
+        sort_field, sort_dir = parse_sort(sort, SORTABLE_FIELDS)
+        find_query = with_after(query, sort_field, sort_dir, after)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
 
-    cursor = (
-        db.vendors
-        .find(query)
-        .sort(sort_field, sort_dir)
-        .skip(skip)
-        .limit(page_size)
+    cursor = db.vendors.find(find_query, OUT_PROJECTION).sort(sort_spec(sort_field, sort_dir))
+    if after is None:
+        cursor = cursor.skip((page - 1) * page_size)
+    docs, total = await fetch_page(
+        cursor.limit(page_size + 1).to_list(length=page_size + 1), db.vendors, query, total_mode
     )
 
-    items: List[Dict[str, Any]] = []
-    async for v in cursor:
-        items.append(_to_out(v))
+    items: List[Dict[str, Any]] = [_to_out(v) for v in docs[:page_size]]
 
-    total = await db.vendors.count_documents(query)
-    return {"items": items, "total": total}
+    return FastJSONResponse({"items": items, "total": total, "next_after": next_cursor(docs, page_size, sort_field)})
 
 @router.patch("/{vendor_id}/status")
 async def update_vendor_status(
@@ -80,10 +86,11 @@ async def update_vendor_status(
 
     oid = ObjectId(vendor_id)
     res = await db.vendors.update_one({"_id": oid}, {"$set": {"status": status}})
+    invalidate_vendor_cache(vendor_id)
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="Vendor not found")
 
-    doc = await db.vendors.find_one({"_id": oid})
+    doc = await db.vendors.find_one({"_id": oid}, OUT_PROJECTION)
     return _to_out(doc)
 
 @router.get("/export")
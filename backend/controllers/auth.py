@@ -3,17 +3,26 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
 from typing import Optional
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 from dependencies import get_db
 from schemas.auth import SignupPayload, LoginPayload  # keep your existing schemas
 from utils.security import (
-    get_password_hash,
-    verify_password,
+    PasswordPoolBusy,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     decode_token,
+    new_token_id,
 )
+from crud.refresh_tokens import (
+    register_refresh_token,
+    consume_refresh_token,
+    revoke_refresh_token,
+    revoke_token_family,
+)
+from utils.token_revocation import is_revoked, mark_revoked
 
 from crud.user import (
     create_user,
@@ -40,6 +49,13 @@ class LogoutRequest(BaseModel):
 
 # ----------------- Helpers -----------------
 
+def _password_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
 def _normalize_status(doc: dict) -> Optional[str]:
     """
     Normalize a 'status' field to lower-case string, or None if missing/empty.
@@ -53,6 +69,36 @@ def _normalize_status(doc: dict) -> Optional[str]:
     return None
 
 
+async def _issue_token_pair(
+    db: AsyncIOMotorDatabase,
+    token_data: dict,
+    family: Optional[str] = None,
+    jti: Optional[str] = None,
+) -> TokenPair:
+    """
+    Access + refresh token; the refresh token is registered by `jti` so it can be
+    rotated once and revoked. `family` links every token rotated from one login.
+    Pass `jti` when it was already recorded elsewhere (the predecessor's replaced_by).
+    """
+    access_token = create_access_token(token_data, expires_delta=timedelta(minutes=15))
+
+    jti = jti or new_token_id()
+    family = family or jti
+    refresh_ttl = timedelta(days=7)
+    refresh_token = create_refresh_token(
+        {**token_data, "jti": jti, "fam": family}, expires_delta=refresh_ttl
+    )
+    await register_refresh_token(
+        db,
+        jti=jti,
+        family=family,
+        user_id=token_data["id"],
+        role=token_data["role"],
+        expires_at=datetime.now(timezone.utc) + refresh_ttl,
+    )
+    return TokenPair(access_token=access_token, refresh_token=refresh_token)
+
+
 # ----------------- Routes -----------------
 
 @router.post("/signup", response_model=TokenPair)
@@ -74,7 +120,10 @@ async def signup(
 
     # Prepare document (hash once, insert once)
     doc = data.model_dump(exclude={"confirm_password"})
-    doc["hashed_password"] = get_password_hash(data.password)
+    try:
+        doc["hashed_password"] = await get_password_hash_async(data.password)
+    except PasswordPoolBusy:
+        raise _password_busy()
     doc.pop("password")
     doc["role"] = data.role
 
@@ -84,10 +133,7 @@ async def signup(
         uid = await create_user(db, doc)
 
     token_data = {"id": uid, "role": data.role}
-    access_token = create_access_token(token_data, expires_delta=timedelta(minutes=15))
-    refresh_token = create_refresh_token(token_data, expires_delta=timedelta(days=7))
-
-    return TokenPair(access_token=access_token, refresh_token=refresh_token)
+    return await _issue_token_pair(db, token_data)
 
 
 @router.post("/login", response_model=TokenPair)
@@ -102,7 +148,13 @@ async def login(
         account = await get_user_by_email(db, creds.email)
 
     # Uniform 401 for unknown email OR wrong password
-    if not account or not verify_password(creds.password, account["hashed_password"]):
+    if not account:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
+    try:
+        password_ok = await verify_password_async(creds.password, account["hashed_password"])
+    except PasswordPoolBusy:
+        raise _password_busy()
+    if not password_ok:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid credentials")
 
     # ---------- STATUS GATING ----------
@@ -140,18 +192,18 @@ async def login(
 
     # ---------- ISSUE TOKENS ----------
     token_data = {"id": str(account["_id"]), "role": creds.role}
-    access_token = create_access_token(token_data, expires_delta=timedelta(minutes=15))
-    refresh_token = create_refresh_token(token_data, expires_delta=timedelta(days=7))
-
-    return TokenPair(access_token=access_token, refresh_token=refresh_token)
+    return await _issue_token_pair(db, token_data)
 
 
 @router.post("/refresh", response_model=TokenPair)
 async def refresh_token(
     body: RefreshRequest,
+    db: AsyncIOMotorDatabase = Depends(get_db),
 ):
     """
     Rotate tokens by providing refresh_token in the request body.
+    Each refresh token can be used once; presenting a used token again revokes
+    every token descended from the same login.
     """
     if not body.refresh_token:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Missing refresh token")
@@ -163,10 +215,25 @@ async def refresh_token(
     except Exception:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid refresh token")
 
+    jti = payload.get("jti")
+    if not jti:
+        # issued before the token registry existed; cannot be revoked, so not accepted
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Refresh token is no longer valid; please log in again")
+
+    # Fast path: known-revoked tokens are rejected without a DB round trip
+    if is_revoked(jti):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Refresh token revoked")
+
+    family = payload.get("fam") or jti
+    new_jti = new_token_id()
+    if not await consume_refresh_token(db, jti, replaced_by=new_jti):
+        # unknown, revoked or already rotated: treat as reuse and kill the whole family
+        await revoke_token_family(db, family)
+        mark_revoked(jti, payload["exp"])
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Refresh token revoked")
+
     token_data = {"id": payload["id"], "role": payload["role"]}
-    new_access = create_access_token(token_data, expires_delta=timedelta(minutes=15))
-    new_refresh = create_refresh_token(token_data, expires_delta=timedelta(days=7))
-    return TokenPair(access_token=new_access, refresh_token=new_refresh)
+    return await _issue_token_pair(db, token_data, family=family, jti=new_jti)
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
@@ -174,7 +241,12 @@ async def logout(
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
     if body and body.refresh_token:
-        payload = decode_token(body.refresh_token)
-        if payload.get("type") == "refresh":
-            await db.refresh_tokens.delete_one({"jti": payload["jti"]})
-    return
\ No newline at end of file
+        try:
+            payload = decode_token(body.refresh_token)
+        except Exception:
+            return
+        jti = payload.get("jti")
+        if payload.get("type") == "refresh" and jti:
+            await revoke_refresh_token(db, jti)
+            mark_revoked(jti, payload["exp"])
+    return
@@ -5,8 +5,10 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional
 
 from dependencies import get_db
-from utils.sl_weather import get_sl_weather
-from utils.pricing import compute_simple_price
+from schemas.pricing import BatchPriceIn, MAX_BATCH_BUCKETS
+from utils.sl_weather import get_sl_weather, get_sl_weather_many, bucket_of
+from utils.pricing import compute_simple_price, compute_simple_price_batch
+from utils.quotes import issue_quote
 
 router = APIRouter(prefix="/pricing", tags=["pricing"])
 
@@ -28,9 +30,10 @@ async def simple_price(
     weather = await get_sl_weather(vlat, vlng)
     calc = compute_simple_price(weather)
 
-    # include small validity window for UI display (purely informational)
+    # validity window; the signed quote can be redeemed at /rentals/assign until then
     valid_minutes = 10
     valid_until = datetime.now(timezone.utc) + timedelta(minutes=valid_minutes)
+    quote = issue_quote(calc["final_price"], calc["currency"], bucket_of(vlat, vlng), valid_until)
 
     return {
         "currency": calc["currency"],
@@ -42,4 +45,54 @@ async def simple_price(
         "final_price": calc["final_price"],
         "valid_until": valid_until,
         "reasons": calc["reasons"],
+        "quote": quote,
+    }
+
+
+@router.post("/batch")
+async def batch_price(body: BatchPriceIn):
+    """
+    Prices many map pins in one call.
+    Points are deduped into weather buckets (at most MAX_BATCH_BUCKETS distinct
+    ones per call), missing buckets are fetched concurrently, and prices are
+    computed over arrays. Items whose weather lookup failed carry an `error`
+    instead of a price.
+    """
+    points = [(p.lat, p.lng) for p in body.points]
+    keys = [bucket_of(lat, lng) for lat, lng in points]
+    distinct = len(set(keys))
+    if distinct > MAX_BATCH_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Points span {distinct} weather areas; at most {MAX_BATCH_BUCKETS} per request",
+        )
+    by_bucket = await get_sl_weather_many(points)
+
+    ok = [i for i, k in enumerate(keys) if not isinstance(by_bucket[k], Exception)]
+    weathers = [by_bucket[keys[i]] for i in ok]
+    calc = compute_simple_price_batch(
+        [w["precip_prob"] for w in weathers],
+        [w["precip_mm"] for w in weathers],
+        [w["wind_kmh"] for w in weathers],
+    )
+    multipliers = calc["multiplier"].tolist()
+    prices = calc["final_price"].tolist()
+
+    items = [{"lat": lat, "lng": lng, "error": "weather unavailable"} for lat, lng in points]
+    for j, i in enumerate(ok):
+        items[i] = {
+            "lat": points[i][0],
+            "lng": points[i][1],
+            "weather": weathers[j],
+            "multiplier": multipliers[j],
+            "final_price": prices[j],
+            "reasons": calc["reasons"][j],
+        }
+
+    valid_until = datetime.now(timezone.utc) + timedelta(minutes=10)
+    return {
+        "currency": calc["currency"],
+        "base_price": calc["base_price"],
+        "valid_until": valid_until,
+        "items": items,
     }
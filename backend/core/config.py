@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,4 +10,63 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int
     refresh_token_expire_days: int
 
+    # Mongo connection pool
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 5
+    mongo_max_idle_time_ms: int = 60_000
+    mongo_wait_queue_timeout_ms: int = 5_000
+    mongo_connect_timeout_ms: int = 5_000
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_socket_timeout_ms: Optional[int] = 20_000
+    mongo_compressors: str = "zlib"   # comma list; snappy/zstd need their extra packages
+    # Multi-document transactions: None = detect (replica set / mongos), or force on/off
+    mongo_transactions: Optional[bool] = None
+
+    # Per-route Mongo command stats (/admin/metrics/db) and slow-command log
+    db_monitoring_enabled: bool = True
+    db_slow_query_ms: float = 100.0
+
+    # Verified access-token claims kept in memory per worker
+    token_cache_size: int = 10000
+
+    # bcrypt runs on a dedicated pool; beyond max_pending in flight, logins get a fast 503
+    password_workers: int = 4
+    password_max_pending: int = 64
+
+    # get_current_vendor principal cache
+    vendor_cache_ttl_seconds: float = 15
+    vendor_cache_size: int = 5000
+
+    # Renter lookups at /rentals/assign (existence + display name)
+    user_cache_ttl_seconds: float = 60
+    user_cache_size: int = 10000
+
+    # Idempotency-Key on assign/return: stored responses live this long; a pending key
+    # whose request hasn't finished after lock_seconds may be taken over by a retry
+    idempotency_ttl_seconds: int = 24 * 3600
+    idempotency_lock_seconds: float = 30
+    idempotency_cache_ttl_seconds: float = 300
+    idempotency_cache_size: int = 10000
+
+    # vendor_inventory counters are recounted from umbrellas this often (and at startup);
+    # drift must show up in two recounts settle_seconds apart before it is corrected
+    inventory_reconcile_seconds: float = 3600
+    inventory_reconcile_settle_seconds: float = 5
+
+    # Numbers each worker reserves at a time for umbrella codes / rental ids
+    sequence_block_size: int = 500
+
+    # Admin list totals: filtered count_documents results are reused for this long
+    count_cache_ttl_seconds: float = 10
+    count_cache_size: int = 1000
+
+    # Weather source for pricing: "open-meteo" (live) or "local" (offline, deterministic)
+    weather_provider: str = "open-meteo"
+    weather_record_file: Optional[str] = None   # open-meteo: append responses as NDJSON
+    weather_replay_file: Optional[str] = None   # local: NDJSON readings to replay
+    weather_seed: int = 0
+    weather_latency_ms: float = 0.0
+    weather_jitter_ms: float = 0.0
+    weather_error_rate: float = 0.0
+
 settings = Settings()
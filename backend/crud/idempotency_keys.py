@@ -0,0 +1,95 @@
+# crud/idempotency_keys.py
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+COLLECTION = "idempotency_keys"
+
+INDEXES = [
+    # _id is "<scope>:<principal>:<key>"; Mongo's TTL monitor drops records once expired
+    IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+]
+
+
+def _coll(db: AsyncIOMotorDatabase):
+    return db[COLLECTION]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await _coll(db).create_indexes(INDEXES)
+
+
+async def reserve_key(
+    db: AsyncIOMotorDatabase,
+    key_id: str,
+    fingerprint: str,
+    *,
+    ttl_seconds: float,
+    lock_seconds: float,
+) -> Optional[Dict[str, Any]]:
+    """
+    Claim `key_id` for a new request. Returns None if the caller now owns it,
+    otherwise the existing record (state "pending" or "done").
+
+    A pending record older than `lock_seconds` (its worker died mid-request)
+    is taken over rather than blocking retries until it expires.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await _coll(db).insert_one({
+            "_id": key_id,
+            "fingerprint": fingerprint,
+            "state": "pending",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+
+    taken = await _coll(db).update_one(
+        {
+            "_id": key_id,
+            "state": "pending",
+            "fingerprint": fingerprint,
+            "created_at": {"$lt": now - timedelta(seconds=lock_seconds)},
+        },
+        {"$set": {"created_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+    )
+    if taken.modified_count:
+        return None
+    existing = await _coll(db).find_one({"_id": key_id})
+    if existing is None:
+        # expired or released between the two calls; let the client retry
+        return {"_id": key_id, "fingerprint": fingerprint, "state": "pending"}
+    return existing
+
+
+async def complete_key(
+    db: AsyncIOMotorDatabase,
+    key_id: str,
+    status_code: int,
+    body: bytes,
+    *,
+    ttl_seconds: float,
+) -> None:
+    now = datetime.now(timezone.utc)
+    await _coll(db).update_one(
+        {"_id": key_id},
+        {"$set": {
+            "state": "done",
+            "status_code": status_code,
+            "body": Binary(body),
+            "completed_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }},
+    )
+
+
+async def release_key(db: AsyncIOMotorDatabase, key_id: str) -> None:
+    """Forget a pending key whose request failed, so a retry runs it again."""
+    await _coll(db).delete_one({"_id": key_id, "state": "pending"})
@@ -0,0 +1,254 @@
+# crud/inventory.py
+"""
+Per-vendor umbrella counts by status, kept in `vendor_inventory` so reads are
+one _id lookup however large the fleet gets.
+
+    {_id: "<vendor_id>", counts: {"available": 12, "rented": 3, ...}, v, updated_at}
+
+plus one fleet-wide document (_id TOTAL_ID) with the same shape. Every write
+that creates umbrellas or changes an umbrella's status or vendor reports it
+here as $inc deltas (`record`), which also bump the document's version `v`.
+`reconcile` recounts from `umbrellas` and corrects drift (e.g. a counter
+update lost to a crash) with $inc, only where the drift is confirmed.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "vendor_inventory"
+TOTAL_ID = "_total"
+
+# (vendor_id, status) -> change in count; combine with .update(), since Counter's + drops negatives
+Deltas = Counter
+
+LAST_RECONCILE: Dict[str, Any] = {}
+
+
+def _coll(db: AsyncIOMotorDatabase):
+    return db[COLLECTION]
+
+
+def status_key(status: Optional[str]) -> str:
+    # umbrellas without a status are rentable, so they count as available (see CLAIMABLE_STATUSES)
+    return status or "available"
+
+
+def added(vendor_id: Any, status: Optional[str], n: int = 1) -> Deltas:
+    return Counter({(str(vendor_id), status_key(status)): n})
+
+
+def moved(before: Optional[Dict[str, Any]], after: Dict[str, Any]) -> Deltas:
+    """Deltas for one umbrella going from `before` to `after` ({vendor_id, status}; missing keys are unchanged)."""
+    if not before or not before.get("vendor_id"):
+        return Counter()
+    old = (str(before["vendor_id"]), status_key(before.get("status")))
+    new = (
+        str(after.get("vendor_id") or before["vendor_id"]),
+        status_key(after["status"] if "status" in after else before.get("status")),
+    )
+    if old == new:
+        return Counter()
+    return Counter({old: -1, new: 1})
+
+
+async def record(db: AsyncIOMotorDatabase, deltas: Deltas, session=None) -> None:
+    """Apply deltas to the vendor documents and the fleet total in one unordered bulk_write."""
+    per_doc: Dict[str, Counter] = {}
+    for (vendor_id, status), n in deltas.items():
+        if n:
+            per_doc.setdefault(vendor_id, Counter())[status] += n
+            per_doc.setdefault(TOTAL_ID, Counter())[status] += n
+    if not per_doc:
+        return
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne(
+            {"_id": _id},
+            {"$inc": {**{f"counts.{s}": n for s, n in inc.items() if n}, "v": 1}, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for _id, inc in per_doc.items()
+        if any(inc.values())
+    ]
+    if ops:
+        await _coll(db).bulk_write(ops, ordered=False, session=session)
+
+
+async def safe_record(db: AsyncIOMotorDatabase, deltas: Deltas, session=None) -> None:
+    """
+    record() for paths where the umbrella write has already happened: a failed
+    counter update is logged rather than failing the request (reconcile fixes it).
+    """
+    try:
+        await record(db, deltas, session=session)
+    except Exception:
+        logger.exception("inventory counter update failed; will be corrected by reconcile")
+
+
+def _shape(doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    counts = {k: v for k, v in ((doc or {}).get("counts") or {}).items() if v}
+    return {
+        "counts": counts,
+        # retired umbrellas stay in the collection but are no longer part of the fleet
+        "total": sum(v for k, v in counts.items() if k != "retired"),
+        "available": counts.get("available", 0),
+        "updated_at": (doc or {}).get("updated_at"),
+    }
+
+
+async def get_vendor_inventory(db: AsyncIOMotorDatabase, vendor_id: str) -> Dict[str, Any]:
+    return _shape(await _coll(db).find_one({"_id": str(vendor_id)}))
+
+
+async def get_fleet_inventory(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    return _shape(await _coll(db).find_one({"_id": TOTAL_ID}))
+
+
+async def _actual_counts(db: AsyncIOMotorDatabase) -> Dict[str, Counter]:
+    pipeline = [
+        {"$match": {"vendor_id": {"$nin": [None, ""]}}},
+        {"$group": {"_id": {"v": "$vendor_id", "s": "$status"}, "n": {"$sum": 1}}},
+    ]
+    actual: Dict[str, Counter] = {TOTAL_ID: Counter()}
+    async for row in db.umbrellas.aggregate(pipeline, allowDiskUse=True):
+        vendor_id = str(row["_id"]["v"])
+        status = status_key(row["_id"].get("s"))
+        actual.setdefault(vendor_id, Counter())[status] += row["n"]
+        actual[TOTAL_ID][status] += row["n"]
+    return actual
+
+
+async def _stored(db: AsyncIOMotorDatabase) -> Dict[str, Tuple[Optional[int], Counter]]:
+    return {
+        d["_id"]: (d.get("v"), Counter(d.get("counts") or {}))
+        async for d in _coll(db).find({}, {"counts": 1, "v": 1})
+    }
+
+
+async def _drift(db: AsyncIOMotorDatabase) -> Tuple[Dict[str, Tuple[Optional[int], Dict[str, int]]], Set[str]]:
+    """
+    ({_id: (version, {status: correction})}, busy ids): counter documents that
+    disagree with a recount. The counters are read before and after the
+    aggregation; a document written in between is busy and not measured, since
+    its difference may just be that write.
+    """
+    before = await _stored(db)
+    actual = await _actual_counts(db)
+    after = await _stored(db)
+
+    out: Dict[str, Tuple[Optional[int], Dict[str, int]]] = {}
+    busy: Set[str] = set()
+    for _id in set(actual) | set(after):
+        if (_id in before) != (_id in after) or before.get(_id, (None,))[0] != after.get(_id, (None,))[0]:
+            busy.add(_id)
+            continue
+        version, stored = after.get(_id, (None, Counter()))
+        want = actual.get(_id, Counter())
+        delta = {s: want[s] - stored[s] for s in set(want) | set(stored) if want[s] != stored[s]}
+        if delta:
+            out[_id] = (version, delta)
+    return out, busy
+
+
+async def _correct(db: AsyncIOMotorDatabase, _id: str, version: Optional[int], delta: Dict[str, int], now) -> bool:
+    """$inc one document by `delta` if it is still at `version`; False if it moved on."""
+    update = {
+        "$inc": {**{f"counts.{s}": n for s, n in delta.items()}, "v": 1},
+        "$set": {"updated_at": now},
+    }
+    if version is None:
+        # created by this correction, or written before versions existed
+        filt: Dict[str, Any] = {"_id": _id, "v": {"$exists": False}}
+    else:
+        filt = {"_id": _id, "v": version}
+    try:
+        res = await _coll(db).update_one(filt, update, upsert=version is None)
+    except DuplicateKeyError:
+        return False   # a concurrent record() created it first
+    return bool(res.matched_count or res.upserted_id is not None)
+
+
+async def reconcile(db: AsyncIOMotorDatabase, settle_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Recount umbrellas per vendor and status (one $group aggregation) and fix
+    counters that drifted, without losing concurrent updates:
+
+    - drift is measured twice, `settle_seconds` apart, and only a document
+      showing the same drift both times is corrected (a request between its
+      umbrella write and its counter $inc looks like drift for a moment);
+    - the correction is an $inc of the difference, applied only if the
+      document's version is unchanged since it was measured.
+
+    The fleet total gets its own correction when it can be measured; when it
+    was too busy to measure, it gets the sum of the vendor corrections
+    applied instead. Returns what was corrected.
+    """
+    global LAST_RECONCILE
+    t0 = time.perf_counter()
+    settle = settings.inventory_reconcile_settle_seconds if settle_seconds is None else settle_seconds
+
+    first, busy = await _drift(db)
+    confirmed: Dict[str, Tuple[Optional[int], Dict[str, int]]] = {}
+    if first:
+        await asyncio.sleep(settle)
+        second, busy_again = await _drift(db)
+        busy |= busy_again
+        confirmed = {_id: second[_id] for _id in first if _id in second and second[_id][1] == first[_id][1]}
+
+    now = datetime.now(timezone.utc)
+    corrected = []
+    applied = Counter()
+    for _id, (version, delta) in confirmed.items():
+        if _id != TOTAL_ID and await _correct(db, _id, version, delta, now):
+            corrected.append(_id)
+            applied.update(delta)
+
+    total_measured = TOTAL_ID not in busy
+    if TOTAL_ID in confirmed:
+        version, delta = confirmed[TOTAL_ID]
+        if await _correct(db, TOTAL_ID, version, delta, now):
+            corrected.append(TOTAL_ID)
+        else:
+            total_measured = False
+    if not total_measured and any(applied.values()):
+        # the total moves with every vendor document, so it carried the same drift
+        await _coll(db).update_one(
+            {"_id": TOTAL_ID},
+            {"$inc": {**{f"counts.{s}": n for s, n in applied.items() if n}, "v": 1}, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+
+    if corrected:
+        logger.warning("inventory reconcile corrected %d counter documents", len(corrected))
+    LAST_RECONCILE = {
+        "drifted": len(first),
+        "corrected": len(corrected),
+        "corrected_ids": sorted(corrected)[:100],
+        "ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        "at": now,
+    }
+    return LAST_RECONCILE
+
+
+async def run_reconcile_loop(db: AsyncIOMotorDatabase, interval: Optional[float] = None) -> None:
+    """Lifespan background task: reconcile at startup, then every `inventory_reconcile_seconds`."""
+    interval = interval or settings.inventory_reconcile_seconds
+    while True:
+        try:
+            await reconcile(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("inventory reconcile failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,87 @@
+# crud/refresh_tokens.py
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel, ReturnDocument
+
+COLLECTION = "refresh_tokens"
+
+INDEXES = [
+    IndexModel([("jti", 1)], unique=True),
+    # Mongo's TTL monitor drops each record once its token has expired
+    IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    IndexModel([("family", 1)]),
+    IndexModel([("revoked_at", 1)]),
+]
+
+
+def _coll(db: AsyncIOMotorDatabase):
+    return db[COLLECTION]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await _coll(db).create_indexes(INDEXES)
+
+
+async def register_refresh_token(
+    db: AsyncIOMotorDatabase,
+    *,
+    jti: str,
+    family: str,
+    user_id: str,
+    role: str,
+    expires_at: datetime,
+) -> None:
+    await _coll(db).insert_one({
+        "jti": jti,
+        "family": family,
+        "user_id": user_id,
+        "role": role,
+        "issued_at": datetime.now(timezone.utc),
+        "expires_at": expires_at,
+        "used_at": None,
+        "replaced_by": None,
+        "revoked_at": None,
+    })
+
+
+async def consume_refresh_token(
+    db: AsyncIOMotorDatabase,
+    jti: str,
+    replaced_by: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically mark a live, unused token as used (rotated to `replaced_by`).
+    Returns None if the token is unknown, expired, revoked or was already used.
+    """
+    now = datetime.now(timezone.utc)
+    return await _coll(db).find_one_and_update(
+        {"jti": jti, "used_at": None, "revoked_at": None, "expires_at": {"$gt": now}},
+        {"$set": {"used_at": now, "replaced_by": replaced_by}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def revoke_refresh_token(db: AsyncIOMotorDatabase, jti: str) -> bool:
+    res = await _coll(db).update_one(
+        {"jti": jti, "revoked_at": None},
+        {"$set": {"revoked_at": datetime.now(timezone.utc)}},
+    )
+    return res.modified_count == 1
+
+
+async def revoke_token_family(db: AsyncIOMotorDatabase, family: str) -> int:
+    res = await _coll(db).update_many(
+        {"family": family, "revoked_at": None},
+        {"$set": {"revoked_at": datetime.now(timezone.utc)}},
+    )
+    return res.modified_count
+
+
+async def list_revoked_since(db: AsyncIOMotorDatabase, since: datetime) -> List[Dict[str, Any]]:
+    cursor = _coll(db).find(
+        {"revoked_at": {"$gte": since}},
+        {"_id": 0, "jti": 1, "expires_at": 1},
+    )
+    return await cursor.to_list(length=None)
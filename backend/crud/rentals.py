@@ -1,9 +1,18 @@
-from typing import Optional, Dict, Any, List
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timezone
-from pymongo import ReturnDocument
-from dependencies import get_db, get_current_user
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from core.config import settings
+from crud import inventory
+from dependencies import get_db, get_current_user, invalidate_vendor_cache, supports_transactions
+from utils.sequences import RENTAL_IDS, format_rental_id
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 # ---------- helpers for specific collections ----------
 def _vendors(db: AsyncIOMotorDatabase):
@@ -24,6 +33,43 @@ async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dic
         return None
     return await db.users.find_one({"_id": _id})
 
+# user_id -> {_id, first_name, name}; only found users are cached
+_RENTER_CACHE = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
+
+def invalidate_renter_cache(user_id) -> None:
+    _RENTER_CACHE.pop(str(user_id))
+
+async def get_renter(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """The few user fields a rental records, cached per worker."""
+    renter = _RENTER_CACHE.get(user_id)
+    if renter is None:
+        try:
+            _id = ObjectId(user_id)
+        except Exception:
+            return None
+        renter = await db.users.find_one({"_id": _id}, {"first_name": 1, "name": 1})
+        if renter is None:
+            return None
+        _RENTER_CACHE.set(user_id, renter)
+    return renter
+
+async def get_renters(db: AsyncIOMotorDatabase, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """get_renter for many ids: cache first, then one $in query for the rest. Unknown ids are absent."""
+    out: Dict[str, Dict[str, Any]] = {}
+    missing: Dict[ObjectId, str] = {}
+    for uid in set(user_ids):
+        renter = _RENTER_CACHE.get(uid)
+        if renter is not None:
+            out[uid] = renter
+        elif ObjectId.is_valid(uid):
+            missing[ObjectId(uid)] = uid
+    if missing:
+        async for renter in db.users.find({"_id": {"$in": list(missing)}}, {"first_name": 1, "name": 1}):
+            uid = missing[renter["_id"]]
+            _RENTER_CACHE.set(uid, renter)
+            out[uid] = renter
+    return out
+
 async def get_vendor_by_id(db: AsyncIOMotorDatabase, vendor_id: str) -> Optional[Dict[str, Any]]:
     try:
         _id = ObjectId(vendor_id)
@@ -41,11 +87,33 @@ async def get_umbrella_by_code(db: AsyncIOMotorDatabase, code: str) -> Optional[
     return await _umbrellas(db).find_one({"code": code})
 
 async def mark_umbrella_status(db: AsyncIOMotorDatabase, code: str, status: str) -> int:
-    res = await _umbrellas(db).update_one(
+    before = await _umbrellas(db).find_one_and_update(
         {"code": code},
         {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}},
+        projection={"status": 1, "vendor_id": 1},
+    )
+    await inventory.safe_record(db, inventory.moved(before, {"status": status}))
+    return 1 if before else 0
+
+
+# Umbrellas with no status are treated as available (matches the old assign check)
+CLAIMABLE_STATUSES = ["available", None, ""]
+
+async def release_umbrella(db: AsyncIOMotorDatabase, code: str, session=None) -> int:
+    """Back to available after a return; clears the rental link."""
+    before = await _umbrellas(db).find_one_and_update(
+        {"code": code},
+        {"$set": {
+            "status": "available",
+            "rented_date": None,
+            "current_rental_id": None,
+            "updated_at": datetime.now(timezone.utc),
+        }},
+        projection={"status": 1, "vendor_id": 1},
+        session=session,
     )
-    return res.matched_count
+    await inventory.safe_record(db, inventory.moved(before, {"status": "available"}), session=session)
+    return 1 if before else 0
 
 
 # ---------- rentals (keyed by umbrella `code`) ----------
@@ -53,6 +121,197 @@ async def create_rental(db: AsyncIOMotorDatabase, doc: Dict[str, Any]) -> str:
     res = await _rentals(db).insert_one(doc)
     return str(res.inserted_id)
 
+async def assign_umbrella(db: AsyncIOMotorDatabase, rental: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Claim the umbrella and record the rental as one unit.
+
+    One conditional find_one_and_update flips the umbrella from available to
+    rented (so of two concurrent assigns only one can win), then the rental is
+    inserted. Inside a transaction when the deployment supports it; otherwise a
+    failed insert is compensated by handing the umbrella back.
+
+    The vendor's inventory counters move with the claim (in the same
+    transaction when there is one).
+
+    `rental` must carry its own _id. A rental without a rental_id is numbered
+    only once the claim succeeds, so refused assigns use up no sequence numbers.
+    Returns the umbrella as it was before the
+    claim ({_id, status, vendor_id}), or None if it doesn't exist or isn't available.
+    DuplicateKeyError from the insert (an open rental already exists) propagates.
+    """
+    code = rental["code"]
+
+    async def _claim(session=None) -> Optional[Dict[str, Any]]:
+        before = await _umbrellas(db).find_one_and_update(
+            {"code": code, "status": {"$in": CLAIMABLE_STATUSES}},
+            {"$set": {
+                "status": "rented",
+                "rented_date": rental["rented_at"],
+                "current_rental_id": rental["_id"],
+                "updated_at": rental["rented_at"],
+            }},
+            projection={"status": 1, "vendor_id": 1},
+            session=session,
+        )
+        if before is not None and rental.get("rental_id") is None:
+            rental["rental_id"] = format_rental_id(await RENTAL_IDS.next(db), rental["rented_at"])
+        return before
+
+    if await supports_transactions(db):
+        async def _txn(session) -> Optional[Dict[str, Any]]:
+            before = await _claim(session)
+            if before is not None:
+                await _rentals(db).insert_one(rental, session=session)
+                await inventory.record(db, inventory.moved(before, {"status": "rented"}), session=session)
+            return before
+
+        async with await db.client.start_session() as session:
+            return await session.with_transaction(_txn)
+
+    before = await _claim()
+    if before is None:
+        return None
+    try:
+        await _rentals(db).insert_one(rental)
+    except Exception:
+        try:
+            await _umbrellas(db).update_one(
+                {"code": code, "current_rental_id": rental["_id"]},
+                {"$set": {
+                    "status": before.get("status") or "available",
+                    "rented_date": None,
+                    "current_rental_id": None,
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+            )
+        except Exception:
+            logger.exception("Could not release umbrella %s after a failed rental insert", code)
+        raise
+    await inventory.safe_record(db, inventory.moved(before, {"status": "rented"}))
+    return before
+
+async def claim_umbrellas(
+    db: AsyncIOMotorDatabase,
+    rentals: List[Dict[str, Any]],
+) -> Tuple[Set[str], Dict[str, Optional[str]]]:
+    """
+    Batch form of assign_umbrella's claim: one bulk_write of conditional
+    available -> rented flips (one rental per code), then one read-back.
+
+    Returns (claimed codes, {code: status} for every umbrella that exists).
+    Codes absent from the status map don't exist. No transaction: the batch
+    endpoints report per-item outcomes rather than all-or-nothing.
+    """
+    if not rentals:
+        return set(), {}
+    ops = [
+        UpdateOne(
+            {"code": r["code"], "status": {"$in": CLAIMABLE_STATUSES}},
+            {"$set": {
+                "status": "rented",
+                "rented_date": r["rented_at"],
+                "current_rental_id": r["_id"],
+                "updated_at": r["rented_at"],
+            }},
+        )
+        for r in rentals
+    ]
+    await _umbrellas(db).bulk_write(ops, ordered=False)
+
+    ours = {r["code"]: r["_id"] for r in rentals}
+    claimed: Set[str] = set()
+    statuses: Dict[str, Optional[str]] = {}
+    deltas = inventory.Deltas()
+    projection = {"code": 1, "status": 1, "current_rental_id": 1, "vendor_id": 1}
+    async for u in _umbrellas(db).find({"code": {"$in": list(ours)}}, projection):
+        statuses[u["code"]] = u.get("status")
+        if u.get("current_rental_id") == ours[u["code"]]:
+            claimed.add(u["code"])
+            # every claimable status counts as available
+            deltas.update(inventory.moved({"vendor_id": u.get("vendor_id"), "status": "available"}, u))
+    await inventory.safe_record(db, deltas)
+    return claimed, statuses
+
+async def unclaim_umbrellas(db: AsyncIOMotorDatabase, rentals: List[Dict[str, Any]]) -> None:
+    """Compensation for claim_umbrellas when the rental insert fails (only undoes our own claim)."""
+    if not rentals:
+        return
+    filt = {"current_rental_id": {"$in": [r["_id"] for r in rentals]}}
+    held = await _umbrellas(db).find(filt, {"status": 1, "vendor_id": 1}).to_list(length=None)
+    await _make_available(db, held, filt)
+
+async def _make_available(db: AsyncIOMotorDatabase, seen: List[Dict[str, Any]], filt: Dict[str, Any]) -> None:
+    """
+    Set the umbrellas in `seen` (read with status and vendor_id) back to
+    available, one update_many per (vendor, status) seen, each also requiring
+    that status and vendor. An umbrella changed by someone else since it was
+    read is left alone, and the inventory counters move only by what matched.
+    """
+    groups: Dict[Tuple[Any, Any], List[ObjectId]] = {}
+    for u in seen:
+        groups.setdefault((u.get("vendor_id"), u.get("status")), []).append(u["_id"])
+    if not groups:
+        return
+    now = datetime.now(timezone.utc)
+    update = {"$set": {"status": "available", "rented_date": None, "current_rental_id": None, "updated_at": now}}
+    keys = list(groups)
+    results = await asyncio.gather(*(
+        _umbrellas(db).update_many({**filt, "_id": {"$in": groups[k]}, "vendor_id": k[0], "status": k[1]}, update)
+        for k in keys
+    ))
+    deltas = inventory.Deltas()
+    for (vendor_id, status_val), res in zip(keys, results):
+        per_unit = inventory.moved({"vendor_id": vendor_id, "status": status_val}, {"status": "available"})
+        deltas.update({k: n * res.matched_count for k, n in per_unit.items()})
+    await inventory.safe_record(db, deltas)
+
+async def insert_rentals(db: AsyncIOMotorDatabase, rentals: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """insert_many (unordered); returns {index in `rentals`: writeErrors entry} for failed inserts."""
+    if not rentals:
+        return {}
+    try:
+        await _rentals(db).insert_many(rentals, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not errors:
+            raise
+        return {err["index"]: err for err in errors}
+    return {}
+
+async def complete_active_rentals(
+    db: AsyncIOMotorDatabase,
+    codes: List[str],
+    returned_at: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch form of complete_active_rental_for_umbrella: one bulk_write closing
+    the open rental of each code, then one read-back. `returned_at` should be
+    millisecond-precise (what Mongo stores) since it identifies the rows closed
+    here. Returns {code: closed rental} for the codes that had an open rental.
+    """
+    if not codes:
+        return {}
+    ops = [UpdateOne({"code": c, "returned_at": None}, {"$set": {"returned_at": returned_at}}) for c in codes]
+    res = await _rentals(db).bulk_write(ops, ordered=False)
+    if res.modified_count == 0:
+        return {}
+    closed: Dict[str, Dict[str, Any]] = {}
+    async for r in _rentals(db).find({"code": {"$in": codes}, "returned_at": returned_at}):
+        closed[r["code"]] = r
+    return closed
+
+async def release_umbrellas(db: AsyncIOMotorDatabase, codes: List[str]) -> Set[str]:
+    """
+    release_umbrella for many codes: one read, then one update per (vendor,
+    status) found (usually just one). Returns the codes that no longer exist.
+    """
+    if not codes:
+        return set()
+    filt = {"code": {"$in": codes}}
+    before = await _umbrellas(db).find(filt, {"code": 1, "status": 1, "vendor_id": 1}).to_list(length=None)
+    await _make_available(db, before, filt)
+    return set(codes) - {u["code"] for u in before}
+
 async def get_active_rental_for_umbrella(db: AsyncIOMotorDatabase, code: str) -> Optional[Dict[str, Any]]:
     return await _rentals(db).find_one({"code": code, "returned_at": None})
 
@@ -90,12 +349,14 @@ async def update_vendor_location(
         update["$set"]["address"] = address
 
     await _vendors(db).update_one({"_id": _id}, update)
+    invalidate_vendor_cache(vendor_id)
     return await _vendors(db).find_one({"_id": _id})
 
 # List vendors that already have a valid location (GeoJSON Point)
 async def list_vendors_with_locations(
     db: AsyncIOMotorDatabase,
     limit: int = 200,
+    projection: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     cursor = _vendors(db).find({
         "location": { "$exists": True, "$ne": None },
@@ -103,6 +364,48 @@ async def list_vendors_with_locations(
         # coordinates[0] = lng, coordinates[1] = lat
         "location.coordinates.0": { "$type": "number" },
         "location.coordinates.1": { "$type": "number" },
-    }).limit(limit)
+    }, projection).limit(limit)
     return await cursor.to_list(length=limit)
 
+# Shops near a point that have umbrellas to rent, nearest first
+async def find_vendors_nearby(
+    db: AsyncIOMotorDatabase,
+    lat: float,
+    lng: float,
+    radius_m: float,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    $geoNear over the vendors.location 2dsphere index (active vendors, or
+    vendors with no status yet, within `radius_m`, nearest first), joined with each vendor's vendor_inventory
+    counter by _id. Vendors with nothing available are skipped; the scan stops
+    as soon as `limit` shops qualify. Each result carries `distance_m` and
+    `available`.
+    """
+    pipeline: List[Dict[str, Any]] = [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lng, lat]},
+            "key": "location",
+            "distanceField": "distance_m",
+            "maxDistance": radius_m,
+            "spherical": True,
+            # vendors created before `status` existed have none and are open for business
+            "query": {"status": {"$in": ["active", None]}},
+        }},
+        # counters are keyed by the vendor id string
+        {"$addFields": {"vendor_key": {"$toString": "$_id"}}},
+        {"$lookup": {
+            "from": inventory.COLLECTION,
+            "localField": "vendor_key",
+            "foreignField": "_id",
+            "as": "inventory",
+        }},
+        {"$addFields": {"available": {"$ifNull": [{"$arrayElemAt": ["$inventory.counts.available", 0]}, 0]}}},
+        {"$match": {"available": {"$gt": 0}}},
+        {"$limit": limit},
+        {"$project": {
+            "shop_name": 1, "address": 1, "telephone": 1,
+            "location.coordinates": 1, "distance_m": 1, "available": 1,
+        }},
+    ]
+    return await _vendors(db).aggregate(pipeline).to_list(length=limit)
@@ -3,6 +3,11 @@ from typing import Any, List, Tuple, Optional, Dict
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timezone
 from pymongo import ReturnDocument
+from crud import inventory
+from utils.pagination import TotalMode, fetch_page, parse_sort, sort_spec, with_after, next_cursor
+
+# same sortable fields / indexes as models.umbrella
+SORTABLE_FIELDS = {"created_at", "code"}
 
 def _coll(db):
     return db.umbrellas
@@ -12,21 +17,21 @@ async def insert_umbrella(db, doc: dict) -> dict:
         **doc,
         "created_at": __import__("datetime").datetime.utcnow(),
     })
+    if doc.get("vendor_id"):
+        await inventory.safe_record(db, inventory.added(doc["vendor_id"], doc.get("status")))
     return await _coll(db).find_one({"_id": res.inserted_id})
 
 async def get_umbrella_by_id(db, code: str) -> Optional[dict]:
-    from bson import ObjectId
-    try:
-        oid = ObjectId(code)
-    except Exception:
-        return None
-    return await _coll(db).find_one({"_id": oid})
+    # umbrellas are scanned by code (same lookup as crud.rentals.get_umbrella_by_id)
+    return await _coll(db).find_one({"code": code})
 
 async def query_umbrellas(
     db, page: int, page_size: int,
     status: Optional[str], vendor_id: Optional[str],
-    city: Optional[str], q: Optional[str], sort: Optional[str]
-) -> Tuple[List[dict], int]:
+    city: Optional[str], q: Optional[str], sort: Optional[str],
+    after: Optional[str] = None,
+    total_mode: TotalMode = "estimate",
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
     filters = {}
     if status: filters["status"] = status
     if vendor_id: filters["vendor_id"] = vendor_id
@@ -37,17 +42,15 @@ async def query_umbrellas(
             {"umbrella_code": {"$regex": q, "$options": "i"}},
             {"qr_code": {"$regex": q, "$options": "i"}},
         ]
-    total = await _coll(db).count_documents(filters)
-
-    sort_list = [("created_at", -1)]
-    if sort:
-        direction = -1 if sort.startswith("-") else 1
-        field = sort.lstrip("+-")
-        sort_list = [(field, direction)]
-
-    cursor = _coll(db).find(filters).sort(sort_list).skip((page - 1) * page_size).limit(page_size)
-    items = await cursor.to_list(length=page_size)
-    return items, total
+    # raises ValueError for non-indexed sort fields or a bad cursor
+    field, direction = parse_sort(sort, SORTABLE_FIELDS)
+    cursor = _coll(db).find(with_after(filters, field, direction, after)).sort(sort_spec(field, direction))
+    if after is None:
+        cursor = cursor.skip((page - 1) * page_size)
+    docs, total = await fetch_page(
+        cursor.limit(page_size + 1).to_list(length=page_size + 1), _coll(db), filters, total_mode
+    )
+    return docs[:page_size], total, next_cursor(docs, page_size, field)
 
 async def set_umbrella_broken(
     db: AsyncIOMotorDatabase,
@@ -64,8 +67,13 @@ async def set_umbrella_broken(
     if set_status_maintenance:
         update["$set"]["status"] = "maintenance"  # blocks rentals
 
-    return await db.umbrellas.find_one_and_update(
+    # the pre-image tells the inventory counters which status the umbrella left
+    before = await db.umbrellas.find_one_and_update(
         {"code": code},
         update,
-        return_document=ReturnDocument.AFTER,
-    )
\ No newline at end of file
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return None
+    await inventory.safe_record(db, inventory.moved(before, update["$set"]))
+    return {**before, **update["$set"]}
\ No newline at end of file
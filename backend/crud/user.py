@@ -1,12 +1,15 @@
 # crud/users.py
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from utils.search import USER_SEARCH_FIELDS, VENDOR_SEARCH_FIELDS, search_doc
 
 async def create_user(db: AsyncIOMotorDatabase, user_data: dict) -> str:
+    user_data["search"] = search_doc(user_data, USER_SEARCH_FIELDS)
     res = await db.users.insert_one(user_data)
     return str(res.inserted_id)
 
 async def create_vendor(db: AsyncIOMotorDatabase, vendor_data: dict) -> str:
+    vendor_data["search"] = search_doc(vendor_data, VENDOR_SEARCH_FIELDS)
     res = await db.vendors.insert_one(vendor_data)
     return str(res.inserted_id)
 
@@ -1,26 +1,78 @@
 # backend/dependencies.py
+import logging
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from bson import ObjectId
 from core.config import settings
-from utils.security import decode_token
+from utils.security import decode_token_cached
+from utils.ttl_cache import TTLCache
+from utils.db_monitor import command_listener
+
+logger = logging.getLogger(__name__)
 
 # DB
 _client: AsyncIOMotorClient = None
+
+def _build_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        settings.mongodb_uri,
+        appname="ombrello-api",
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+        waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+        connectTimeoutMS=settings.mongo_connect_timeout_ms,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        socketTimeoutMS=settings.mongo_socket_timeout_ms,
+        compressors=settings.mongo_compressors or None,
+        event_listeners=[command_listener] if settings.db_monitoring_enabled else [],
+    )
+
 def get_db() -> AsyncIOMotorDatabase:
     global _client
     if not _client:
-        _client = AsyncIOMotorClient(settings.mongodb_uri)
+        _client = _build_client()
     return _client.ombrello_db
 
+def close_db() -> None:
+    global _client, _txn_support
+    if _client:
+        _client.close()
+    _client = None
+    _txn_support = None
+
+_txn_support: Optional[bool] = None
+
+async def supports_transactions(db: AsyncIOMotorDatabase) -> bool:
+    """True on replica sets and sharded clusters (checked once via `hello`); standalone servers can't."""
+    global _txn_support
+    if settings.mongo_transactions is not None:
+        return settings.mongo_transactions
+    if _txn_support is None:
+        try:
+            hello = await db.client.admin.command("hello")
+            _txn_support = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except Exception:
+            logger.warning("Could not determine transaction support; assuming none", exc_info=True)
+            _txn_support = False
+    return _txn_support
+
+# Vendor principal docs, per worker. Writes that change a vendor's status or
+# location invalidate explicitly; the short TTL bounds staleness on other workers.
+_VENDOR_CACHE = TTLCache(maxsize=settings.vendor_cache_size, ttl=settings.vendor_cache_ttl_seconds)
+
+def invalidate_vendor_cache(vendor_id) -> None:
+    _VENDOR_CACHE.pop(str(vendor_id))
+
 # Auth
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     try:
-        payload = decode_token(token)
+        payload = decode_token_cached(token)
         if payload.get("type") != "access":
             raise JWTError()
     except JWTError:
@@ -61,14 +113,17 @@ async def get_current_vendor(
             detail="Invalid token subject",
         )
 
-    vendor = await db.vendors.find_one({"_id": _id})
-    if not vendor:
-        # If vendors are stored in a single 'users' collection with role='vendor',
-        # swap the collection lookup accordingly.
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Vendor not found",
-        )
+    vendor = _VENDOR_CACHE.get(current["id"])
+    if vendor is None:
+        vendor = await db.vendors.find_one({"_id": _id})
+        if not vendor:
+            # If vendors are stored in a single 'users' collection with role='vendor',
+            # swap the collection lookup accordingly.
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Vendor not found",
+            )
+        _VENDOR_CACHE.set(current["id"], vendor)
 
     # Optional extra gate (belt & suspenders): ensure active vendors only
     status_val = (vendor.get("status") or "").strip().lower()
@@ -79,7 +134,8 @@ async def get_current_vendor(
             detail=f"Vendor is not active (status='{status_val}')",
         )
 
-    return vendor
+    # shallow copy so handlers can't mutate the cached doc
+    return dict(vendor)
 
 async def get_current_user_doc(
     current: dict = Depends(get_current_user),
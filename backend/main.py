@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.admin.auth_admin import router as auth_admin_router
@@ -10,11 +12,46 @@ from controllers.vendor import rentals as rental_controller, vendor as vendor_co
 from controllers.vendor import returns as return_controller
 from controllers.vendor import umbrella
 from controllers.pricing_controller import router as pricing_router
+from dependencies import get_db, close_db
+from models.indexes import ensure_all_indexes
+from crud.inventory import run_reconcile_loop
+from utils.db_monitor import RouteScopeMiddleware
+from utils.sl_weather import open_weather_provider, close_weather_provider
+from utils.sequences import release_sequences
+from utils.weather_prewarm import run_prewarm_loop
+from utils.security import shutdown_password_pool
+from utils.token_revocation import run_revocation_sync_loop
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: Mongo pool + indexes, weather provider (pooled upstream HTTP session), background jobs
+    db = get_db()
+    await ensure_all_indexes(db)
+    await open_weather_provider()
+    tasks = [
+        asyncio.create_task(run_prewarm_loop(db)),
+        asyncio.create_task(run_revocation_sync_loop(db)),
+        asyncio.create_task(run_reconcile_loop(db)),
+    ]
+    try:
+        yield
+    finally:
+        # Shutdown
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await close_weather_provider()
+        await release_sequences(db)
+        shutdown_password_pool()
+        close_db()
+
 
 app = FastAPI(
     title="Ombrello API",
     version="1.0.0",
     description="Backend for Ombrello umbrella-rental",
+    lifespan=lifespan,
 )
 
 
@@ -25,6 +62,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RouteScopeMiddleware)
 
 # Mount the auth routes under /auth
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
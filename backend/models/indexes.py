@@ -0,0 +1,114 @@
+# models/indexes.py
+"""
+Every index the routes rely on, created (or verified, if already present) at startup.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import PyMongoError
+
+from models import umbrella
+from crud import idempotency_keys, refresh_tokens
+from utils.search import USER_SEARCH_FIELDS, VENDOR_SEARCH_FIELDS, search_indexes
+
+logger = logging.getLogger(__name__)
+
+# {field, _id} pairs back keyset pagination for every admin SORTABLE_FIELDS entry
+USER_INDEXES = [
+    IndexModel([("email", ASCENDING)], unique=True),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("email", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("first_name", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    *search_indexes(USER_SEARCH_FIELDS),
+]
+
+VENDOR_INDEXES = [
+    IndexModel([("email", ASCENDING)], unique=True),
+    IndexModel([("location", GEOSPHERE)]),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("shop_name", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("email", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    *search_indexes(VENDOR_SEARCH_FIELDS),
+]
+
+RENTAL_INDEXES = [
+    IndexModel([("rental_id", ASCENDING)], unique=True),
+    # /returns and the active-rental check: {code, returned_at: None}
+    IndexModel([("code", ASCENDING), ("returned_at", ASCENDING)]),
+    # at most one open rental per umbrella (rentals are always inserted with returned_at: None)
+    IndexModel(
+        [("code", ASCENDING)],
+        name="one_active_rental_per_code",
+        unique=True,
+        partialFilterExpression={"returned_at": {"$type": "null"}},
+    ),
+    # /rentals/my-active
+    IndexModel([("user_id", ASCENDING), ("returned_at", ASCENDING), ("rented_at", DESCENDING)]),
+    # vendor earnings
+    IndexModel([("vendor_id", ASCENDING), ("rented_at", DESCENDING)]),
+    # admin revenue range
+    IndexModel([("rented_at", DESCENDING)]),
+]
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": USER_INDEXES,
+    "vendors": VENDOR_INDEXES,
+    "rentals": RENTAL_INDEXES,
+    umbrella.COLLECTION: umbrella.INDEXES,
+    refresh_tokens.COLLECTION: refresh_tokens.INDEXES,
+    idempotency_keys.COLLECTION: idempotency_keys.INDEXES,
+}
+
+LAST_REPORT: Dict[str, Any] = {}
+
+
+async def _ensure_one(db: AsyncIOMotorDatabase, coll: str, model: IndexModel) -> Dict[str, Any]:
+    doc = model.document
+    name = doc["name"]
+    t0 = time.perf_counter()
+    try:
+        await db[coll].create_indexes([model])
+        ok, error = True, None
+    except PyMongoError as e:
+        # e.g. duplicate data blocking a unique index; keep booting, but say so
+        ok, error = False, str(e)
+        logger.error("index %s.%s could not be created: %s", coll, name, e)
+    return {
+        "collection": coll,
+        "index": name,
+        "ok": ok,
+        "error": error,
+        "ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
+
+
+async def ensure_all_indexes(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """
+    Create or verify every index in INDEXES (collections in parallel).
+    Creating an index that already exists with the same spec is a no-op.
+    """
+    global LAST_REPORT
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(
+        _ensure_one(db, coll, model)
+        for coll, models in INDEXES.items()
+        for model in models
+    ))
+    failed = [r for r in results if not r["ok"]]
+    LAST_REPORT = {
+        "total_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        "indexes": len(results),
+        "failed": len(failed),
+        "details": results,
+    }
+    logger.info(
+        "ensured %d indexes in %.1f ms (%d failed)",
+        LAST_REPORT["indexes"], LAST_REPORT["total_ms"], LAST_REPORT["failed"],
+    )
+    return LAST_REPORT
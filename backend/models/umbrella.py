@@ -1,16 +1,41 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple, List
+import time
+from typing import AsyncIterator, Dict, Any, Iterable, Optional, Tuple, List
 
-from utils.sequences import next_seq_block, format_umbrella_code
+from pymongo import IndexModel
+
+from crud import inventory
+
+from utils.sequences import UMBRELLA_CODES, format_umbrella_code
 from utils.vendors import get_vendor_doc_or_raise
+from utils.search import UMBRELLA_SEARCH_FIELDS, search_doc, search_filter, search_indexes
+from utils.pagination import TotalMode, fetch_page, parse_sort, sort_spec, with_after, next_cursor
 
 COLLECTION = "umbrellas"
 
+# list_paged sort= is limited to these; each has a {field, _id} index below
+SORTABLE_FIELDS = {"created_at", "code"}
+
+INDEXES = [
+    IndexModel([("code", 1)], unique=True),
+    IndexModel([("vendor_id", 1), ("status", 1)]),
+    IndexModel([("created_at", -1), ("_id", -1)]),
+    IndexModel([("code", 1), ("_id", 1)]),
+    IndexModel([("vendor_id", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("status", 1), ("created_at", -1), ("_id", -1)]),
+    *search_indexes(UMBRELLA_SEARCH_FIELDS),
+]
+
 async def ensure_indexes(db: AsyncIOMotorDatabase):
-    await db[COLLECTION].create_index("code", unique=True)
-    await db[COLLECTION].create_index([("vendor_id", 1), ("status", 1)])
+    await db[COLLECTION].create_indexes(INDEXES)
+
+# exactly what _out reads
+OUT_PROJECTION = {
+    "code": 1, "vendor_id": 1, "shop_name": 1, "status": 1, "condition": 1,
+    "rented_date": 1, "qr_value": 1, "created_at": 1, "updated_at": 1,
+}
 
 def _out(doc: Dict[str, Any]) -> Dict[str, Any]:
     return {
@@ -37,8 +62,7 @@ async def create(db: AsyncIOMotorDatabase, payload: Dict[str, Any]) -> Dict[str,
     # code auto-gen if missing
     code = (payload.get("code") or "").strip()
     if not code:
-        start, _ = await next_seq_block(db, "umbrellas", 1)
-        code = format_umbrella_code(start)
+        code = format_umbrella_code(await UMBRELLA_CODES.next(db))
 
     # rented_date clears unless status='rented'
     rented_date = payload.get("rented_date")
@@ -56,10 +80,25 @@ async def create(db: AsyncIOMotorDatabase, payload: Dict[str, Any]) -> Dict[str,
         "created_at": now,
         "updated_at": now,
     }
+    to_insert["search"] = search_doc(to_insert, UMBRELLA_SEARCH_FIELDS)
 
     res = await db[COLLECTION].insert_one(to_insert)
-    saved = await db[COLLECTION].find_one({"_id": res.inserted_id})
-    return _out(saved)
+    await inventory.safe_record(db, inventory.added(vendor_doc["_id"], to_insert["status"]))
+    return _out({**to_insert, "_id": res.inserted_id})
+
+def _new_doc(code: str, vendor_oid: ObjectId, shop_name: Optional[str], now: datetime) -> Dict[str, Any]:
+    return {
+        "code": code,
+        "search": search_doc({"code": code}, UMBRELLA_SEARCH_FIELDS),
+        "vendor_id": vendor_oid,
+        "shop_name": shop_name,
+        "status": "available",
+        "condition": "good",
+        "rented_date": None,
+        "qr_value": code,
+        "created_at": now,
+        "updated_at": now,
+    }
 
 async def bulk_create_for_shop(
     db: AsyncIOMotorDatabase,
@@ -71,26 +110,82 @@ async def bulk_create_for_shop(
     vendor_doc = await get_vendor_doc_or_raise(db, vendor_id, require_active=True)
 
     now = datetime.utcnow()
-    start, end = await next_seq_block(db, "umbrellas", count)
-    codes = [format_umbrella_code(i) for i in range(start, end + 1)]
-
-    docs = [{
-        "code": code,
-        "vendor_id": vendor_doc["_id"],
-        "shop_name": shop_name,
-        "status": "available",
-        "condition": "good",
-        "rented_date": None,
-        "qr_value": code,
-        "created_at": now,
-        "updated_at": now,
-    } for code in codes]
+    codes = [format_umbrella_code(i) for i in await UMBRELLA_CODES.take(db, count)]
+    docs = [_new_doc(code, vendor_doc["_id"], shop_name, now) for code in codes]
 
     if docs:
+        # insert_many sets each doc's _id, so the response needs no re-read
         await db[COLLECTION].insert_many(docs)
+        await inventory.safe_record(db, inventory.added(vendor_doc["_id"], "available", len(docs)))
+    return [_out(d) for d in docs]
+
+async def resolve_vendors(db: AsyncIOMotorDatabase, vendor_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Active vendors by id string, in one query. Raises ValueError naming any invalid or ineligible id."""
+    wanted = set(vendor_ids)
+    bad = sorted(v for v in wanted if not ObjectId.is_valid(v))
+    if bad:
+        raise ValueError(f"Invalid vendor_id: {', '.join(bad)}")
+    found = {
+        str(v["_id"]): v
+        async for v in db.vendors.find(
+            {"_id": {"$in": [ObjectId(v) for v in wanted]}, "status": "active"},
+            {"_id": 1, "shop_name": 1},
+        )
+    }
+    missing = sorted(wanted - set(found))
+    if missing:
+        raise ValueError(f"Vendor not found or not eligible: {', '.join(missing)}")
+    return found
+
+async def provision(
+    db: AsyncIOMotorDatabase,
+    orders: List[Dict[str, Any]],
+    vendors: Dict[str, Dict[str, Any]],
+    chunk_size: int = 1000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Create umbrellas for many vendors, yielding progress events as it goes.
+
+    `orders` are {vendor_id, count, shop_name?} (shop_name defaults to the
+    vendor's); `vendors` comes from resolve_vendors. Each order is inserted in
+    ordered insert_many chunks of `chunk_size`, only one chunk being in memory
+    at a time. Every chunk event lists the created {id, code} pairs, taken from
+    the inserted documents. If a chunk fails, an "error" event reports it and
+    provisioning stops; everything reported before it is committed.
+    """
+    t0 = time.perf_counter()
+    total = sum(o["count"] for o in orders)
+    done = 0
+    yield {"event": "start", "vendors": len(vendors), "orders": len(orders), "total": total}
+
+    for n, order in enumerate(orders):
+        vendor = vendors[order["vendor_id"]]
+        shop_name = order.get("shop_name") or vendor.get("shop_name")
+        remaining = order["count"]
+        while remaining:
+            size = min(chunk_size, remaining)
+            try:
+                now = datetime.utcnow()
+                codes = [format_umbrella_code(i) for i in await UMBRELLA_CODES.take(db, size)]
+                docs = [_new_doc(code, vendor["_id"], shop_name, now) for code in codes]
+                await db[COLLECTION].insert_many(docs, ordered=True)
+                await inventory.safe_record(db, inventory.added(vendor["_id"], "available", size))
+            except Exception as e:
+                yield {"event": "error", "order": n, "vendor_id": order["vendor_id"], "inserted": done, "detail": str(e)}
+                return
+            remaining -= size
+            done += size
+            yield {
+                "event": "chunk",
+                "order": n,
+                "vendor_id": order["vendor_id"],
+                "count": size,
+                "inserted": done,
+                "total": total,
+                "items": [{"id": str(d["_id"]), "code": d["code"]} for d in docs],
+            }
 
-    cursor = db[COLLECTION].find({"code": {"$in": codes}}).sort("code", 1)
-    return [_out(x) async for x in cursor]
+    yield {"event": "done", "inserted": done, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
 
 async def get_by_id(db: AsyncIOMotorDatabase, uid: str) -> Optional[Dict[str, Any]]:
     from bson.errors import InvalidId
@@ -98,7 +193,7 @@ async def get_by_id(db: AsyncIOMotorDatabase, uid: str) -> Optional[Dict[str, An
         oid = ObjectId(uid)
     except InvalidId:
         return None
-    doc = await db[COLLECTION].find_one({"_id": oid})
+    doc = await db[COLLECTION].find_one({"_id": oid}, OUT_PROJECTION)
     return _out(doc) if doc else None
 
 async def list_paged(
@@ -108,10 +203,18 @@ async def list_paged(
     q: Optional[str],
     status: Optional[str],
     vendor_id: Optional[str],
-) -> Tuple[list, int]:
+    sort: Optional[str] = None,
+    after: Optional[str] = None,
+    total_mode: TotalMode = "estimate",
+) -> Tuple[list, Optional[int], Optional[str]]:
+    """
+    Returns (items, total, next_after). With `after` (even '') pages by keyset
+    cursor instead of page number; total follows `total_mode` (None for "none").
+    Raises ValueError for a bad sort or cursor.
+    """
     filt: Dict[str, Any] = {}
     if q:
-        filt["code"] = {"$regex": q, "$options": "i"}
+        filt.update(search_filter(q, UMBRELLA_SEARCH_FIELDS))
     if status:
         filt["status"] = status
     if vendor_id:
@@ -120,33 +223,50 @@ async def list_paged(
         except Exception:
             pass
 
+    sort_field, sort_dir = parse_sort(sort, SORTABLE_FIELDS)
     cursor = (
         db[COLLECTION]
-        .find(filt)
-        .sort("created_at", -1)
-        .skip((page - 1) * page_size)
-        .limit(page_size)
+        .find(with_after(filt, sort_field, sort_dir, after), OUT_PROJECTION)
+        .sort(sort_spec(sort_field, sort_dir))
     )
-    total = await db[COLLECTION].count_documents(filt)
-    items = [_out(x) async for x in cursor]
-    return items, total
+    if after is None:
+        cursor = cursor.skip((page - 1) * page_size)
+    docs, total = await fetch_page(
+        cursor.limit(page_size + 1).to_list(length=page_size + 1), db[COLLECTION], filt, total_mode
+    )
+    items = [_out(x) for x in docs[:page_size]]
+    return items, total, next_cursor(docs, page_size, sort_field)
 
 async def update(db: AsyncIOMotorDatabase, uid: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if "vendor_id" in payload:
         if not payload["vendor_id"]:
             raise ValueError("vendor_id cannot be empty")
-        payload["vendor_id"] = await get_vendor_doc_or_raise(db, payload["vendor_id"], require_active=True)
+        vendor_doc = await get_vendor_doc_or_raise(db, payload["vendor_id"], require_active=True)
+        payload["vendor_id"] = vendor_doc["_id"]
 
     if payload.get("status") and payload["status"] != "rented":
         payload["rented_date"] = None
+        payload["current_rental_id"] = None
+
+    if any(f in payload for f in UMBRELLA_SEARCH_FIELDS):
+        payload["search"] = search_doc(payload, UMBRELLA_SEARCH_FIELDS)
 
     payload["updated_at"] = datetime.utcnow()
-    await db[COLLECTION].update_one({"_id": ObjectId(uid)}, {"$set": payload})
+    before = await db[COLLECTION].find_one_and_update(
+        {"_id": ObjectId(uid)}, {"$set": payload}, projection={"status": 1, "vendor_id": 1}
+    )
+    if before is None:
+        return None
+    await inventory.safe_record(db, inventory.moved(before, payload))
     return await get_by_id(db, uid)
 
 async def soft_delete(db: AsyncIOMotorDatabase, uid: str) -> bool:
-    res = await db[COLLECTION].update_one(
+    before = await db[COLLECTION].find_one_and_update(
         {"_id": ObjectId(uid)},
-        {"$set": {"status": "retired", "updated_at": datetime.utcnow()}}
+        {"$set": {"status": "retired", "updated_at": datetime.utcnow()}},
+        projection={"status": 1, "vendor_id": 1},
     )
-    return res.modified_count == 1
+    if before is None:
+        return False
+    await inventory.safe_record(db, inventory.moved(before, {"status": "retired"}))
+    return True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional, Literal
 from datetime import datetime
 
 UmbrellaStatus = Literal["available", "rented", "maintenance", "lost", "retired"]
@@ -37,5 +37,24 @@ class BulkAddUmbrellas(BaseModel):
     shop_name: Optional[str] = None
     count: int = Field(..., ge=1, le=1000)
 
+# /admin/umbrellas/provision: units per call
+MAX_PROVISION_UNITS = 100_000
+
+class ProvisionOrder(BaseModel):
+    vendor_id: str
+    count: int = Field(..., ge=1, le=MAX_PROVISION_UNITS)
+    shop_name: Optional[str] = None   # defaults to the vendor's shop_name
+
+class ProvisionUmbrellas(BaseModel):
+    orders: List[ProvisionOrder] = Field(..., min_length=1, max_length=5000)
+    chunk_size: int = Field(1000, ge=100, le=5000)
+
+    @model_validator(mode="after")
+    def _cap_total(self):
+        total = sum(o.count for o in self.orders)
+        if total > MAX_PROVISION_UNITS:
+            raise ValueError(f"at most {MAX_PROVISION_UNITS} umbrellas per call (got {total})")
+        return self
+
 class ReportBrokenUmbrella(BaseModel):
     code: str
@@ -0,0 +1,15 @@
+# backend/schemas/pricing.py
+from pydantic import BaseModel, Field
+from typing import List
+
+MAX_BATCH_POINTS = 5000
+# distinct weather buckets per request; well below sl_weather.MAX_BUCKETS so one
+# call can neither flush the prewarmed cache nor fan out into thousands of fetches
+MAX_BATCH_BUCKETS = 400
+
+class PricePoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+class BatchPriceIn(BaseModel):
+    points: List[PricePoint] = Field(..., min_length=1, max_length=MAX_BATCH_POINTS)
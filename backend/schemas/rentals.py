@@ -1,13 +1,17 @@
 # backend/schemas/rentals.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+# scans per /rentals/assign/batch or /returns/batch call
+MAX_BATCH_SCANS = 200
+
 class AssignRentalIn(BaseModel):
     code: str = Field(..., description="QR-parsed umbrella ID")
     user_id: str = Field(..., description="QR-parsed user ID")
     shop_name: Optional[str] = None
-    fee: Optional[float] = None
+    fee: Optional[float] = Field(None, description="Optional; must equal the quote's price")
+    quote: Optional[str] = Field(None, description="Signed quote from /pricing/simple for this shop's location; sets the fee")
 
 class RentalOut(BaseModel):
     id: str
@@ -21,6 +25,21 @@ class RentalOut(BaseModel):
     returned_at: Optional[datetime] = None
     fee: Optional[float] = None
 
+    @classmethod
+    def from_doc(cls, doc: dict) -> "RentalOut":
+        return cls(
+            id=str(doc["_id"]),
+            rental_id=doc["rental_id"],
+            code=doc["code"],
+            vendor_id=doc["vendor_id"],
+            shop_name=doc.get("shop_name"),
+            user_id=doc["user_id"],
+            user_name=doc.get("user_name"),
+            rented_at=doc["rented_at"],
+            returned_at=doc.get("returned_at"),
+            fee=doc.get("fee"),
+        )
+
 class ReturnRentalIn(BaseModel):
     code: str
 
@@ -28,4 +47,22 @@ class MyActiveRentalOut(BaseModel):
     id: str
     rental_id: str
     code: Optional[str] = None
-    rented_at: datetime
\ No newline at end of file
+    rented_at: datetime
+
+class AssignBatchIn(BaseModel):
+    items: List[AssignRentalIn] = Field(..., min_length=1, max_length=MAX_BATCH_SCANS)
+
+class ReturnBatchIn(BaseModel):
+    items: List[ReturnRentalIn] = Field(..., min_length=1, max_length=MAX_BATCH_SCANS)
+
+class BatchItemResult(BaseModel):
+    index: int
+    code: str
+    status_code: int = Field(..., description="What the single-scan endpoint would have answered")
+    rental: Optional[RentalOut] = None
+    error: Optional[str] = None
+
+class BatchResultOut(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
@@ -0,0 +1,60 @@
+# scripts/backfill_search.py
+"""
+Write the `search` shadow fields (utils/search.py) onto users, vendors and
+umbrellas created before indexed admin search existed. Safe to re-run: only
+documents without `search` are touched unless --all is given.
+
+Run from backend/:  python -m scripts.backfill_search [--all] [batch_size]
+"""
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from dependencies import close_db, get_db
+from utils.search import (
+    UMBRELLA_SEARCH_FIELDS,
+    USER_SEARCH_FIELDS,
+    VENDOR_SEARCH_FIELDS,
+    search_doc,
+)
+
+TARGETS = {
+    "users": USER_SEARCH_FIELDS,
+    "vendors": VENDOR_SEARCH_FIELDS,
+    "umbrellas": UMBRELLA_SEARCH_FIELDS,
+}
+
+
+async def backfill(db, name: str, fields, batch_size: int, everything: bool) -> int:
+    coll = db[name]
+    filt = {} if everything else {"search": {"$exists": False}}
+    cursor = coll.find(filt, {f: 1 for f in fields}).batch_size(batch_size)
+
+    done = 0
+    ops = []
+    async for doc in cursor:
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search": search_doc(doc, fields)}}))
+        if len(ops) >= batch_size:
+            await coll.bulk_write(ops, ordered=False)
+            done += len(ops)
+            ops = []
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        done += len(ops)
+    return done
+
+
+async def main(batch_size: int, everything: bool) -> None:
+    db = get_db()
+    try:
+        for name, fields in TARGETS.items():
+            n = await backfill(db, name, fields, batch_size, everything)
+            print(f"{name:10s} {n} documents updated")
+    finally:
+        close_db()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--all"]
+    asyncio.run(main(int(args[0]) if args else 1000, "--all" in sys.argv[1:]))
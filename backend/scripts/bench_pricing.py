@@ -0,0 +1,58 @@
+# scripts/bench_pricing.py
+"""
+Scalar vs vectorized pricing.
+
+Checks that compute_simple_price_batch matches compute_simple_price exactly on
+random weather (plus every band edge), then times both paths.
+
+Run from backend/:  python -m scripts.bench_pricing [n]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from utils.pricing import compute_simple_price, compute_simple_price_batch
+
+
+def _inputs(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    edges_pp = [0, 39.999, 40, 59.9, 60, 79.99, 80, 100]
+    edges_mm = [0, 1.99, 2, 4.99, 5, 30]
+    edges_wind = [0, 44.9, 45, 90]
+    rows = [(p, m, w) for p in edges_pp for m in edges_mm for w in edges_wind]
+    while len(rows) < n:
+        rows.append((rnd.uniform(0, 100), rnd.uniform(0, 20), rnd.uniform(0, 80)))
+    return rows[:n]
+
+
+def main(n: int = 5000) -> None:
+    rows = _inputs(n)
+    pp, mm, wind = (list(c) for c in zip(*rows))
+
+    for hour in range(24):
+        now = datetime(2025, 1, 1, hour, 30).astimezone()
+        batch = compute_simple_price_batch(pp, mm, wind, now=now)
+        for i, (p, m, w) in enumerate(rows):
+            one = compute_simple_price({"precip_prob": p, "precip_mm": m, "wind_kmh": w}, now=now)
+            assert one["final_price"] == batch["final_price"][i], (i, hour)
+            assert one["multiplier"] == batch["multiplier"][i], (i, hour)
+            assert one["reasons"] == batch["reasons"][i], (i, hour)
+    print(f"ok: {n} points x 24 hours match exactly")
+
+    now = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    for p, m, w in rows:
+        compute_simple_price({"precip_prob": p, "precip_mm": m, "wind_kmh": w}, now=now)
+    scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compute_simple_price_batch(pp, mm, wind, now=now)
+    vector = time.perf_counter() - t0
+
+    print(f"scalar:     {scalar * 1e3:8.2f} ms  ({scalar / n * 1e6:.2f} us/point)")
+    print(f"vectorized: {vector * 1e3:8.2f} ms  ({vector / n * 1e6:.2f} us/point)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
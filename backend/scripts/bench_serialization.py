@@ -0,0 +1,85 @@
+# scripts/bench_serialization.py
+"""
+Per-page cost of an admin list response, before and after projection pushdown
+and the orjson response path.
+
+- wire:   BSON bytes Mongo sends for a page of full vs projected documents
+- decode: time to decode those bytes into dicts (what the driver does)
+- encode: jsonable_encoder + json.dumps (FastAPI default) vs FastJSONResponse
+
+Run from backend/:  python -m scripts.bench_serialization [page_size] [iterations]
+"""
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import bson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from controllers.admin.admin_users import OUT_PROJECTION, _to_out
+from utils.fast_json import FastJSONResponse
+from utils.search import USER_SEARCH_FIELDS, search_doc
+
+
+def _user(rnd: random.Random, i: int) -> dict:
+    doc = {
+        "_id": ObjectId(),
+        "first_name": rnd.choice(["Kamal", "Nimali", "Sunil", "Anjali"]) + f" {i}",
+        "last_name": rnd.choice(["Perera", "Silva", "Fernando"]),
+        "email": f"user{i}@example.lk",
+        "telephone": f"077{rnd.randrange(10**7):07d}",
+        "hashed_password": "$2b$12$" + "".join(rnd.choices("abcdefghijklmnop0123456789", k=53)),
+        "role": "user",
+        "status": "active",
+        "address": f"{rnd.randrange(1, 400)} Galle Road, Colombo {rnd.randrange(1, 15)}",
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+    }
+    doc["search"] = search_doc(doc, USER_SEARCH_FIELDS)
+    return doc
+
+
+def _project(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k == "_id" or k in OUT_PROJECTION}
+
+
+def _time(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main(page_size: int = 100, n: int = 500) -> None:
+    rnd = random.Random(3)
+    full = [_user(rnd, i) for i in range(page_size)]
+    projected = [_project(d) for d in full]
+
+    full_bson = b"".join(bson.encode(d) for d in full)
+    proj_bson = b"".join(bson.encode(d) for d in projected)
+    decode_full = _time(lambda: bson.decode_all(full_bson), n)
+    decode_proj = _time(lambda: bson.decode_all(proj_bson), n)
+
+    page = {"items": [_to_out(d) for d in projected], "total": 12345, "next_after": None}
+    default_body = JSONResponse(content=None).render(jsonable_encoder(page))
+    fast_body = FastJSONResponse(content=None).render(page)
+    assert json.loads(default_body) == json.loads(fast_body), "orjson output differs"
+
+    encode_default = _time(lambda: JSONResponse(content=None).render(jsonable_encoder(page)), n)
+    encode_fast = _time(lambda: FastJSONResponse(content=None).render(page), n)
+
+    print(f"page of {page_size} users")
+    print(f"wire (BSON):  full {len(full_bson):7d} B   projected {len(proj_bson):7d} B   "
+          f"saved {len(full_bson) - len(proj_bson)} B ({1 - len(proj_bson) / len(full_bson):.0%})")
+    print(f"decode:       full {decode_full:7.1f} us  projected {decode_proj:7.1f} us")
+    print(f"encode:       default {encode_default:7.1f} us  orjson {encode_fast:7.1f} us  "
+          f"({encode_default / encode_fast:.1f}x), body {len(fast_body)} B")
+    print(f"total CPU:    before {decode_full + encode_default:7.1f} us  after {decode_proj + encode_fast:7.1f} us")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
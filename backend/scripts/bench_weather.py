@@ -0,0 +1,92 @@
+# scripts/bench_weather.py
+"""
+Offline load test of the pricing path: get_sl_weather + compute_simple_price.
+
+Uses LocalWeatherProvider (no network) with injected latency, then fires waves of
+concurrent lookups over a fixed set of buckets to exercise cold misses, coalescing,
+warm hits and stale-while-revalidate. Prints cache counters and latency percentiles.
+
+Run from backend/:
+    python -m scripts.bench_weather --requests 5000 --buckets 50 --latency-ms 80 --jitter-ms 40
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from utils import sl_weather
+from utils.pricing import compute_simple_price
+from utils.weather_providers import LocalWeatherProvider
+
+
+def _pct(sorted_ms, p):
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(p / 100.0 * (len(sorted_ms) - 1))))]
+
+
+async def _price(lat, lng, samples):
+    t0 = time.perf_counter()
+    weather = await sl_weather.get_sl_weather(lat, lng)
+    compute_simple_price(weather)
+    samples.append((time.perf_counter() - t0) * 1000.0)
+
+
+async def _wave(label, points, n, concurrency, rnd):
+    samples = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        lat, lng = rnd.choice(points)
+        async with sem:
+            await _price(lat, lng, samples)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(n)))
+    wall = time.perf_counter() - t0
+    samples.sort()
+    print(
+        f"{label:<12} n={n:<6} wall={wall * 1e3:8.1f} ms  "
+        f"p50={_pct(samples, 50):7.2f}  p95={_pct(samples, 95):7.2f}  "
+        f"p99={_pct(samples, 99):7.2f}  max={samples[-1]:7.2f} ms"
+    )
+
+
+async def main(args):
+    rnd = random.Random(args.seed)
+    await sl_weather.set_weather_provider(LocalWeatherProvider(
+        seed=args.seed,
+        replay_file=args.replay,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+    ))
+    # points around Colombo, one per ~1 km bucket
+    points = [(6.90 + i * 0.01, 79.85 + (i % 7) * 0.01) for i in range(args.buckets)]
+
+    await _wave("cold", points, args.requests, args.concurrency, rnd)
+    await _wave("warm", points, args.requests, args.concurrency, rnd)
+
+    # age every entry past TTL (but inside the stale window) and go again
+    cache = sl_weather._CACHE
+    for key in list(cache._data):
+        fetched, weather = cache.get(key)
+        cache.set(key, (fetched - sl_weather.TTL_SECONDS - 1, weather), ttl=sl_weather.STALE_SECONDS)
+    await _wave("stale", points, args.requests, args.concurrency, rnd)
+    await asyncio.sleep(args.latency_ms / 1000.0 + args.jitter_ms / 1000.0 + 0.05)
+
+    print()
+    for k, v in sl_weather.weather_stats().items():
+        print(f"  {k:<22} {v}")
+    await sl_weather.close_weather_provider()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--buckets", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=500)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    ap.add_argument("--jitter-ms", type=float, default=40.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--replay", default=None, help="NDJSON recorded readings")
+    asyncio.run(main(ap.parse_args()))
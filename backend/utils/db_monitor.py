@@ -0,0 +1,177 @@
+# utils/db_monitor.py
+"""
+Per-route Mongo command instrumentation.
+
+RouteScopeMiddleware puts the ASGI scope of the current request in a contextvar;
+Motor copies the context into its executor threads, so the PyMongo command listener
+can attribute every command to the FastAPI route template (e.g. "GET /admin/users")
+that issued it. Commands slower than DB_SLOW_QUERY_MS are logged with their filter
+shape (values replaced by type names).
+"""
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_scope: ContextVar[Optional[dict]] = ContextVar("db_monitor_scope", default=None)
+
+BACKGROUND = "(background)"
+
+
+def _route_label(scope: Optional[dict]) -> str:
+    if scope is None:
+        return BACKGROUND
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "(unmatched)"
+    return f"{scope.get('method', '')} {path}"
+
+
+class RouteScopeMiddleware:
+    """Pure ASGI middleware: exposes the request scope to the command listener."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+            if settings.db_monitoring_enabled:
+                command_listener.count_request(_route_label(scope))
+
+
+# ---------- filter shape / reply helpers ----------
+
+def _shape(value: Any, depth: int = 0) -> Any:
+    if depth > 6:
+        return "…"
+    if isinstance(value, dict):
+        return {k: _shape(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return []
+        return [_shape(value[0], depth + 1)] + (["…"] if len(value) > 1 else [])
+    return f"<{type(value).__name__}>" if value is not None else None
+
+
+def _command_filter(name: str, command: Dict[str, Any]) -> Any:
+    if name == "find":
+        return command.get("filter")
+    if name in ("count", "findAndModify", "distinct"):
+        return command.get("query")
+    if name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return pipeline[0] if pipeline else None
+    if name == "update":
+        ups = command.get("updates") or []
+        return ups[0].get("q") if ups else None
+    if name == "delete":
+        dels = command.get("deletes") or []
+        return dels[0].get("q") if dels else None
+    return None
+
+
+def _docs_returned(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if isinstance(batch, list) else 0
+    if "value" in reply:  # findAndModify
+        return 1 if reply.get("value") is not None else 0
+    n = reply.get("n")
+    return int(n) if isinstance(n, (int, float)) else 0
+
+
+# ---------- listener ----------
+
+class RouteCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, Any, Any]] = {}
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def _route(self, label: str) -> Dict[str, Any]:
+        r = self._routes.get(label)
+        if r is None:
+            r = self._routes[label] = {
+                "requests": 0, "commands": 0, "total_ms": 0.0,
+                "docs_returned": 0, "errors": 0, "slow": 0, "by_command": {},
+            }
+        return r
+
+    def count_request(self, label: str) -> None:
+        with self._lock:
+            self._route(label)["requests"] += 1
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        name = event.command_name
+        self._pending[(event.connection_id, event.request_id)] = (
+            _route_label(_current_scope.get()),
+            name,
+            # collection name for CRUD commands
+            event.command.get("collection") if name == "getMore" else event.command.get(name),
+            _command_filter(name, event.command),
+        )
+
+    def _finish(self, event, reply: Optional[Dict[str, Any]], ok: bool) -> None:
+        info = self._pending.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        label, name, coll, filt = info
+        ms = event.duration_micros / 1000.0
+        docs = _docs_returned(reply) if reply else 0
+        slow = ms >= settings.db_slow_query_ms
+
+        with self._lock:
+            r = self._route(label)
+            r["commands"] += 1
+            r["total_ms"] += ms
+            r["docs_returned"] += docs
+            r["errors"] += 0 if ok else 1
+            r["slow"] += 1 if slow else 0
+            c = r["by_command"].setdefault(name, {"count": 0, "total_ms": 0.0, "docs_returned": 0})
+            c["count"] += 1
+            c["total_ms"] += ms
+            c["docs_returned"] += docs
+
+        if slow:
+            logger.warning(
+                "slow mongo command %s %s.%s %.1f ms docs=%d route=%s filter=%s",
+                name, event.database_name, coll, ms, docs, label, _shape(filt),
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, event.reply, True)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, None, False)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for label, r in self._routes.items():
+                item = {**r, "by_command": {k: dict(v) for k, v in r["by_command"].items()}}
+                item["total_ms"] = round(item["total_ms"], 2)
+                reqs = r["requests"]
+                item["commands_per_request"] = round(r["commands"] / reqs, 2) if reqs else None
+                item["ms_per_request"] = round(r["total_ms"] / reqs, 2) if reqs else None
+                for c in item["by_command"].values():
+                    c["total_ms"] = round(c["total_ms"], 2)
+                out[label] = item
+            if reset:
+                self._routes.clear()
+        return dict(sorted(out.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+
+
+command_listener = RouteCommandListener()
@@ -0,0 +1,38 @@
+# utils/fast_json.py
+"""
+orjson-backed JSON responses for high-volume endpoints.
+
+Returning a FastJSONResponse from a route skips FastAPI's jsonable_encoder and
+response_model validation: the handler already builds plain dicts (via the
+_out helpers), so the content is serialized exactly once. datetimes are
+encoded natively (same ISO-8601 text as jsonable_encoder); ObjectIds become
+their hex string.
+"""
+from datetime import date, time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
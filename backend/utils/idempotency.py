@@ -0,0 +1,116 @@
+# utils/idempotency.py
+"""
+Idempotency-Key support for the write endpoints vendor phones retry blindly
+(/rentals/assign, /returns and their batch forms).
+
+The first request with a key reserves it in the TTL-indexed idempotency_keys
+collection, runs, and stores its 2xx response; a retry with the same key and
+body gets those exact bytes back (header Idempotent-Replayed: true) without
+touching rentals or umbrellas. Completed responses are also kept in a small
+per-worker cache, so a retry landing on the same worker costs no DB call.
+
+- same key, different body       -> 422
+- same key, first still running  -> 409 (retry shortly)
+- first attempt failed (non-2xx) -> key released; a retry runs again
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+
+from core.config import settings
+from crud.idempotency_keys import complete_key, release_key, reserve_key
+from utils.fast_json import dumps
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# key_id -> (fingerprint, status_code, body)
+_DONE = TTLCache(maxsize=settings.idempotency_cache_size, ttl=settings.idempotency_cache_ttl_seconds)
+
+
+def fingerprint(scope: str, payload: BaseModel) -> str:
+    canonical = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{scope}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _replay(status_code: int, body: bytes) -> Response:
+    return Response(
+        content=bytes(body),
+        status_code=status_code,
+        media_type="application/json",
+        headers={REPLAY_HEADER: "true"},
+    )
+
+
+def _mismatch() -> HTTPException:
+    return HTTPException(
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        "Idempotency-Key was already used with a different request body",
+    )
+
+
+async def idempotent(
+    db: AsyncIOMotorDatabase,
+    key: Optional[str],
+    *,
+    scope: str,
+    principal: str,
+    payload: BaseModel,
+    handler: Callable[[], Awaitable[Any]],
+    status_code: int = status.HTTP_200_OK,
+) -> Any:
+    """
+    Run `handler` at most once per (scope, principal, key). Without a key this
+    is just `await handler()`. With one, the handler's result is rendered once
+    and returned as a Response, so the first answer and any replay are
+    byte-identical.
+    """
+    if key is None:
+        return await handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    key_id = f"{scope}:{principal}:{key}"
+    fp = fingerprint(scope, payload)
+
+    cached: Optional[Tuple[str, int, bytes]] = _DONE.get(key_id)
+    if cached is not None:
+        if cached[0] != fp:
+            raise _mismatch()
+        return _replay(cached[1], cached[2])
+
+    existing = await reserve_key(
+        db, key_id, fp,
+        ttl_seconds=settings.idempotency_ttl_seconds,
+        lock_seconds=settings.idempotency_lock_seconds,
+    )
+    if existing is not None:
+        if existing.get("fingerprint") != fp:
+            raise _mismatch()
+        if existing.get("state") == "done":
+            _DONE.set(key_id, (fp, existing["status_code"], bytes(existing["body"])))
+            return _replay(existing["status_code"], existing["body"])
+        raise HTTPException(status.HTTP_409_CONFLICT, "A request with this Idempotency-Key is still in progress")
+
+    try:
+        result = await handler()
+    except BaseException:
+        try:
+            await release_key(db, key_id)
+        except Exception:
+            logger.warning("Could not release idempotency key %s", key_id, exc_info=True)
+        raise
+
+    body = dumps(jsonable_encoder(result))
+    await complete_key(db, key_id, status_code, body, ttl_seconds=settings.idempotency_ttl_seconds)
+    _DONE.set(key_id, (fp, status_code, body))
+    return Response(content=body, status_code=status_code, media_type="application/json")
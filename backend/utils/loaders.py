@@ -0,0 +1,115 @@
+# utils/loaders.py
+"""
+Request-scoped batched lookups by _id (dataloader style).
+
+    loaders: Loaders = Depends(get_loaders)
+    umb = await loaders.get("umbrellas", ["code"]).load(rental["umbrella_id"])
+
+Every load() issued in the same event-loop tick is collected and resolved with a
+single {_id: {$in: [...]}} query; results are memoized for the rest of the
+request, so joining N rentals to umbrellas/users/vendors costs one round trip
+per collection instead of N.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+from dependencies import get_db
+
+
+def _oid(value: Any) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except Exception:
+        return None
+
+
+class BatchLoader:
+    """Loads documents of one collection by _id; ids may be ObjectIds or their hex strings."""
+
+    def __init__(self, coll: AsyncIOMotorCollection, projection: Optional[Dict[str, int]] = None):
+        self._coll = coll
+        self._projection = projection
+        self._docs: Dict[ObjectId, Optional[Dict[str, Any]]] = {}
+        self._pending: Dict[ObjectId, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+        self.queries = 0
+
+    async def load(self, id_: Any) -> Optional[Dict[str, Any]]:
+        """The document, or None if the id is invalid or not found."""
+        oid = _oid(id_)
+        if oid is None:
+            return None
+        if oid in self._docs:
+            return self._docs[oid]
+
+        fut = self._pending.get(oid)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                # runs after every load() already queued in this tick has registered
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+            fut = loop.create_future()
+            self._pending[oid] = fut
+        return await fut
+
+    async def load_many(self, ids: Iterable[Any]) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """{id: document or None} for the given ids, in one query."""
+        keys = list(dict.fromkeys(ids))
+        docs = await asyncio.gather(*(self.load(k) for k in keys))
+        return dict(zip(keys, docs))
+
+    async def _dispatch(self) -> None:
+        batch, self._pending = self._pending, {}
+        self.queries += 1
+        try:
+            docs = await self._coll.find({"_id": {"$in": list(batch)}}, self._projection).to_list(length=None)
+        except Exception as e:
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        found = {d["_id"]: d for d in docs}
+        for oid, fut in batch.items():
+            doc = found.get(oid)
+            self._docs[oid] = doc
+            if not fut.done():
+                fut.set_result(doc)
+
+
+class Loaders:
+    """One BatchLoader per (collection, fields) for the lifetime of a request."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self._db = db
+        self._loaders: Dict[Tuple[str, Optional[Tuple[str, ...]]], BatchLoader] = {}
+
+    def get(self, collection: str, fields: Optional[Sequence[str]] = None) -> BatchLoader:
+        key = (collection, tuple(fields) if fields else None)
+        loader = self._loaders.get(key)
+        if loader is None:
+            projection = {f: 1 for f in fields} if fields else None
+            loader = self._loaders[key] = BatchLoader(self._db[collection], projection)
+        return loader
+
+    @property
+    def umbrellas(self) -> BatchLoader:
+        return self.get("umbrellas")
+
+    @property
+    def users(self) -> BatchLoader:
+        return self.get("users")
+
+    @property
+    def vendors(self) -> BatchLoader:
+        return self.get("vendors")
+
+
+def get_loaders(db: AsyncIOMotorDatabase = Depends(get_db)) -> Loaders:
+    # FastAPI caches dependencies per request, so every consumer shares one Loaders
+    return Loaders(db)
@@ -0,0 +1,135 @@
+# utils/pagination.py
+"""
+Keyset ("cursor") pagination helpers for admin lists.
+
+A page is fetched with a sort on (field, _id) and the opaque `after` token of the
+previous page's last row, instead of skip(). Only fields listed as sortable (and
+backed by a {field, _id} index) are accepted, so `sort=` can't force a collection scan.
+
+Totals are computed per `total_mode` (see count_total) alongside the page query.
+"""
+import asyncio
+import base64
+from datetime import datetime
+from typing import Any, Awaitable, Collection, Dict, List, Literal, Optional, Tuple
+
+from bson import ObjectId, json_util
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from core.config import settings
+from utils.ttl_cache import TTLCache
+
+# none: skip counting; estimate: metadata count / short-lived cached count; exact: always count
+TotalMode = Literal["none", "estimate", "exact"]
+
+# (collection, canonical filter) -> count
+_COUNT_CACHE = TTLCache(maxsize=settings.count_cache_size, ttl=settings.count_cache_ttl_seconds)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# what a sort value / _id can be; anything else (a dict like {"$ne": null}) would
+# turn the keyset filter into an operator query
+_CURSOR_TYPES = (str, int, float, bool, ObjectId, datetime, type(None))
+
+
+def parse_sort(sort: Optional[str], allowed: Collection[str], default: str = "-created_at") -> Tuple[str, int]:
+    """'-created_at' -> ('created_at', -1). Raises ValueError for non-indexed fields."""
+    sort = (sort or default).strip()
+    direction = -1 if sort.startswith("-") else 1
+    field = sort.lstrip("+-")
+    if field not in allowed:
+        raise ValueError(f"Unsupported sort field '{field}'. Allowed: {sorted(allowed)}")
+    return field, direction
+
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    return [(field, direction), ("_id", direction)]
+
+
+def encode_cursor(doc: Dict[str, Any], field: str) -> str:
+    raw = json_util.dumps({"v": doc.get(field), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Tuple[Any, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json_util.loads(raw)
+        value, last_id = data["v"], data["id"]
+    except Exception:
+        raise InvalidCursor("Invalid 'after' cursor")
+    if not isinstance(value, _CURSOR_TYPES) or not isinstance(last_id, _CURSOR_TYPES):
+        raise InvalidCursor("Invalid 'after' cursor")
+    return value, last_id
+
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: Any) -> Dict[str, Any]:
+    """
+    Rows strictly after (value, last_id) in the (field, _id) order.
+    Missing/null sort values order before everything else ascending (after, descending).
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    if value is None:
+        tie = {field: None, "_id": {op: last_id}}
+        return {"$or": [tie, {field: {"$ne": None}}]} if direction > 0 else tie
+    branches: List[Dict[str, Any]] = [
+        {field: {op: value}},
+        {field: value, "_id": {op: last_id}},
+    ]
+    if direction < 0:
+        branches.append({field: None})
+    return {"$or": branches}
+
+
+def with_after(filt: Dict[str, Any], field: str, direction: int, after: Optional[str]) -> Dict[str, Any]:
+    """Combine a list filter with the keyset condition for `after` (no-op if empty)."""
+    if not after:
+        return filt
+    value, last_id = decode_cursor(after)
+    cond = keyset_filter(field, direction, value, last_id)
+    return {"$and": [filt, cond]} if filt else cond
+
+
+def next_cursor(docs: List[Dict[str, Any]], page_size: int, field: str) -> Optional[str]:
+    """Call with up to page_size + 1 docs; returns the token for the next page, or None."""
+    if len(docs) <= page_size:
+        return None
+    return encode_cursor(docs[page_size - 1], field)
+
+
+async def count_total(coll: AsyncIOMotorCollection, filt: Dict[str, Any], mode: TotalMode = "estimate") -> Optional[int]:
+    """
+    Total for a list filter.
+    - none: None, no query at all.
+    - estimate: estimated_document_count() when unfiltered (collection metadata, exact
+      without a filter barring unclean shutdowns); otherwise count_documents() cached
+      for count_cache_ttl_seconds per filter, so paging through one result set counts once.
+    - exact: count_documents() every time.
+    """
+    if mode == "none":
+        return None
+    if mode == "exact":
+        return await coll.count_documents(filt)
+    if not filt:
+        return await coll.estimated_document_count()
+
+    key = (coll.name, json_util.dumps(filt, sort_keys=True))
+    total = _COUNT_CACHE.get(key)
+    if total is None:
+        total = await coll.count_documents(filt)
+        _COUNT_CACHE.set(key, total)
+    return total
+
+
+async def fetch_page(
+    page_query: Awaitable[List[Dict[str, Any]]],
+    coll: AsyncIOMotorCollection,
+    filt: Dict[str, Any],
+    mode: TotalMode = "estimate",
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Run the page query and its count concurrently; returns (docs, total)."""
+    docs, total = await asyncio.gather(page_query, count_total(coll, filt, mode))
+    return docs, total
@@ -1,67 +1,190 @@
 # backend/utils/simple_pricing.py
-from datetime import datetime, timezone
-from typing import Dict
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
 
-GLOBAL_BASE_LKR = 200.0 
+import numpy as np
+
+GLOBAL_BASE_LKR = 200.0
+
+# (threshold, multiplier, reason) — a value >= threshold falls in that band; highest band wins
+Band = Tuple[float, float, str]
 
 def _round_to(n: float, step: int = 10) -> float:
     return float(int(round(n / step)) * step)
 
-def compute_simple_price(weather: Dict[str, float], now: datetime | None = None) -> Dict:
+
+@dataclass(frozen=True)
+class PricingRules:
     """
-    Deterministic, lightweight, Sri Lanka-friendly umbrella pricing.
+    Deterministic, lightweight, Sri Lanka-friendly umbrella pricing rules.
 
-    Rules:
-    - Start from a global base price (LKR).
-    - Bump up for rain probability bands and rain mm.
+    - Start from a base price (LKR).
+    - Bump up for rain probability bands and rain mm (one band each, stacked).
     - Gentle peak-hour bump (7–9, 16–19).
     - Slight discount if very windy (>= 45 km/h).
     - Clamp, then round to nearest 10 LKR.
     """
+    base_lkr: float = GLOBAL_BASE_LKR
+    precip_prob_bands: Tuple[Band, ...] = ((40, 1.10, "pp>=40%"), (60, 1.20, "pp>=60%"), (80, 1.30, "pp>=80%"))
+    precip_mm_bands: Tuple[Band, ...] = ((2, 1.10, "rain>=2mm"), (5, 1.20, "rain>=5mm"))
+    wind_bands: Tuple[Band, ...] = ((45, 0.95, "wind>=45kmh"),)
+    peak_hours: FrozenSet[int] = frozenset([7, 8, 9, 16, 17, 18, 19])
+    peak_multiplier: float = 1.05
+    min_multiplier: float = 0.7
+    max_multiplier: float = 1.6
+    round_step: int = 10
+
+
+class PriceTable:
+    """
+    PricingRules compiled into a lookup table indexed by
+    hour × precip-probability band × rain-mm band × wind band.
+
+    Every cell is computed once at build time (multiplying in the same order as the
+    original if/elif rules), so an evaluation is a few bisects plus an index.
+    """
+
+    def __init__(self, rules: PricingRules, tz: Optional[tzinfo] = None):
+        self.rules = rules
+        # None = the server's local zone, resolved per call so DST changes apply
+        self.tz = tz
+
+        self._edges = [
+            [b[0] for b in rules.precip_prob_bands],
+            [b[0] for b in rules.precip_mm_bands],
+            [b[0] for b in rules.wind_bands],
+        ]
+        shape = (24, *(len(e) + 1 for e in self._edges))
+        self.shape = shape
+
+        # flat, C order: (clamped multiplier, round(m, 2), final price at base_lkr, reasons)
+        self.cells: List[Tuple[float, float, float, Dict[str, float]]] = []
+        for idx in np.ndindex(*shape):
+            m, reasons = self._evaluate(*idx)
+            final = _round_to(rules.base_lkr * m, rules.round_step)
+            self.cells.append((m, round(m, 2), final, reasons))
+
+        # column views for the vectorized path
+        self.multiplier = np.array([c[1] for c in self.cells], dtype=np.float64)
+        self.final_price = np.array([c[2] for c in self.cells], dtype=np.float64)
+
+    def _evaluate(self, hour: int, pp_i: int, mm_i: int, wind_i: int) -> Tuple[float, Dict[str, float]]:
+        r = self.rules
+        m = 1.0
+        reasons: Dict[str, float] = {}
+
+        for i, bands in ((pp_i, r.precip_prob_bands), (mm_i, r.precip_mm_bands)):
+            if i:
+                _, mult, label = bands[i - 1]
+                m *= mult; reasons[label] = round(mult - 1.0, 2)
+
+        if hour in r.peak_hours:
+            m *= r.peak_multiplier; reasons["peak_hours"] = round(r.peak_multiplier - 1.0, 2)
+
+        if wind_i:
+            _, mult, label = r.wind_bands[wind_i - 1]
+            m *= mult; reasons[label] = round(mult - 1.0, 2)
+
+        if m < r.min_multiplier: m = r.min_multiplier
+        if m > r.max_multiplier: m = r.max_multiplier
+        return m, reasons
+
+    def local_hour(self, now: datetime) -> int:
+        # astimezone(None) converts to the system local time at `now`, with its current offset
+        return now.astimezone(self.tz).hour
+
+    def _band(self, edges: List[float], value: float) -> int:
+        return 0 if value != value else bisect_right(edges, value)  # NaN -> no band
+
+    def flat_index(self, weather: Dict[str, float], hour: int) -> int:
+        e_pp, e_mm, e_wind = self._edges
+        _, n_pp, n_mm, n_wind = self.shape
+        i = hour
+        i = i * n_pp + self._band(e_pp, weather.get("precip_prob", 0.0))
+        i = i * n_mm + self._band(e_mm, weather.get("precip_mm", 0.0))
+        return i * n_wind + self._band(e_wind, weather.get("wind_kmh", 0.0))
+
+    def flat_index_many(self, hour: int, *columns: np.ndarray) -> np.ndarray:
+        bands = [
+            np.where(np.isnan(col), 0, np.searchsorted(edges, col, side="right"))
+            for edges, col in zip(self._edges, columns)
+        ]
+        return np.ravel_multi_index((np.full(bands[0].shape, hour), *bands), self.shape)
+
+
+_RULES = PricingRules()
+_TABLE: Optional[PriceTable] = None
+
+def get_price_table() -> PriceTable:
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = PriceTable(_RULES)
+    return _TABLE
+
+def set_pricing_rules(rules: PricingRules) -> PriceTable:
+    """Swap the active rules; the table is rebuilt only here."""
+    global _RULES, _TABLE
+    _RULES, _TABLE = rules, PriceTable(rules)
+    return _TABLE
+
+
+def compute_simple_price(
+    weather: Dict[str, float],
+    now: datetime | None = None,
+    base: float | None = None,
+) -> Dict:
+    """
+    Price for one weather reading, looked up from the compiled PriceTable.
+    `base` overrides the rules' base price (e.g. vendor-specific bases).
+    """
     now = now or datetime.now(timezone.utc)
+    table = get_price_table()
 
-    base = GLOBAL_BASE_LKR
-    pp   = weather.get("precip_prob", 0.0)  # %
-    mm   = weather.get("precip_mm", 0.0)    # mm
-    wind = weather.get("wind_kmh", 0.0)     # km/h
-
-    m = 1.0  # multiplier
-    reasons = {}
-
-    # Rain probability (choose ONE band)
-    if pp >= 80:
-        m *= 1.30; reasons["pp>=80%"] = +0.30
-    elif pp >= 60:
-        m *= 1.20; reasons["pp>=60%"] = +0.20
-    elif pp >= 40:
-        m *= 1.10; reasons["pp>=40%"] = +0.10
-    # <40% -> no change
-
-    # Actual rain amount (stack with probability)
-    if mm >= 5:
-        m *= 1.20; reasons["rain>=5mm"] = +0.20
-    elif mm >= 2:
-        m *= 1.10; reasons["rain>=2mm"] = +0.10
-
-    # Peak commuter times (gentle)
-    local_hour = now.astimezone().hour  # assumes server TZ close enough; fine for rule of thumb
-    if 7 <= local_hour <= 9 or 16 <= local_hour <= 19:
-        m *= 1.05; reasons["peak_hours"] = +0.05
-
-    # High wind → slight discount (umbrellas less desirable)
-    if wind >= 45:
-        m *= 0.95; reasons["wind>=45kmh"] = -0.05
-
-    # Clamp & round
-    if m < 0.7: m = 0.7
-    if m > 1.6: m = 1.6
-    raw = base * m
-    final_lkr = _round_to(raw, 10)
+    m, multiplier, final_lkr, reasons = table.cells[table.flat_index(weather, table.local_hour(now))]
+    if base is None or base == table.rules.base_lkr:
+        base = table.rules.base_lkr
+    else:
+        final_lkr = _round_to(base * m, table.rules.round_step)
 
     return {
         "currency": "LKR",
         "base_price": base,
-        "multiplier": round(m, 2),
+        "multiplier": multiplier,
         "final_price": final_lkr,
-        "reasons": reasons,
+        "reasons": dict(reasons),
+    }
+
+
+def compute_simple_price_batch(
+    precip_prob: Sequence[float],
+    precip_mm: Sequence[float],
+    wind_kmh: Sequence[float],
+    now: datetime | None = None,
+) -> Dict:
+    """
+    NumPy version of compute_simple_price over equal-length arrays.
+
+    Band indices are found with searchsorted and gathered from the same PriceTable,
+    so every element matches compute_simple_price exactly. Returns arrays
+    (`multiplier`, `final_price`) plus a list of per-item `reasons` dicts.
+    """
+    now = now or datetime.now(timezone.utc)
+    table = get_price_table()
+
+    columns = (
+        np.asarray(precip_prob, dtype=np.float64),
+        np.asarray(precip_mm, dtype=np.float64),
+        np.asarray(wind_kmh, dtype=np.float64),
+    )
+    flat = table.flat_index_many(table.local_hour(now), *columns)
+
+    return {
+        "currency": "LKR",
+        "base_price": table.rules.base_lkr,
+        "multiplier": table.multiplier[flat],
+        "final_price": table.final_price[flat],
+        # copies: the cell dicts belong to the compiled table
+        "reasons": [dict(table.cells[i][3]) for i in flat.tolist()],
     }
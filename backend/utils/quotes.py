@@ -0,0 +1,80 @@
+# utils/quotes.py
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+
+from core.config import settings
+
+# q1.<payload>.<sig>  (base64url, no padding)
+QUOTE_PREFIX = "q1"
+_SIG_BYTES = 16  # truncated HMAC-SHA256; plenty for a 10-minute token
+
+
+def _b64e(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _b64d(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+def _sign(signing_input: bytes) -> bytes:
+    key = settings.secret_key.encode("utf-8")
+    return hmac.new(key, b"price-quote:" + signing_input, hashlib.sha256).digest()[:_SIG_BYTES]
+
+
+def issue_quote(
+    price: float,
+    currency: str,
+    bucket: Tuple[int, int],
+    valid_until: datetime,
+) -> str:
+    """Return a compact signed token carrying the quoted price, weather bucket and expiry."""
+    payload = {
+        "p": price,
+        "c": currency,
+        "b": [int(bucket[0]), int(bucket[1])],
+        "exp": int(valid_until.timestamp()),
+    }
+    body = _b64e(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{QUOTE_PREFIX}.{body}".encode("ascii")
+    return f"{QUOTE_PREFIX}.{body}.{_b64e(_sign(signing_input))}"
+
+
+def verify_quote(token: str, now: float | None = None) -> Dict[str, Any]:
+    """
+    Verify a quote in-process (no weather or DB lookup).
+    Returns {"price", "currency", "bucket", "valid_until"} or raises ValueError.
+    """
+    try:
+        prefix, body, sig = token.split(".")
+    except (AttributeError, ValueError):
+        raise ValueError("malformed quote")
+    if prefix != QUOTE_PREFIX:
+        raise ValueError("unsupported quote version")
+
+    try:
+        expected = _sign(f"{prefix}.{body}".encode("ascii"))
+        if not hmac.compare_digest(expected, _b64d(sig)):
+            raise ValueError("bad quote signature")
+        payload = json.loads(_b64d(body))
+        price = float(payload["p"])
+        exp = int(payload["exp"])
+        bucket = (int(payload["b"][0]), int(payload["b"][1]))
+        currency = str(payload["c"])
+    except ValueError:
+        raise
+    except Exception:
+        raise ValueError("malformed quote")
+
+    if (now if now is not None else time.time()) >= exp:
+        raise ValueError("quote expired")
+
+    return {
+        "price": price,
+        "currency": currency,
+        "bucket": bucket,
+        "valid_until": datetime.fromtimestamp(exp, tz=timezone.utc),
+    }
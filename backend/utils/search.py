@@ -0,0 +1,71 @@
+# utils/search.py
+"""
+Indexed admin search.
+
+Each searchable document carries a `search` sub-document:
+    search.<field>  lowercase, whitespace-collapsed copy of <field>   (indexed)
+    search.grams    sorted trigrams of all those copies               (substring matches)
+
+Every query is a case-insensitive substring match. Queries of 3+ characters
+narrow candidates through the multikey index on search.grams and confirm with a
+regex on the shadow fields. A 1-2 character query has no trigram to narrow by,
+so its regex runs over the keys of the search.<field> indexes: a scan of
+those small indexes, not of the documents. `search` is written on insert (and when a field changes);
+scripts/backfill_search.py fills it in for older documents.
+"""
+import re
+from typing import Any, Dict, List, Sequence
+
+from pymongo import ASCENDING, IndexModel
+
+USER_SEARCH_FIELDS = ("first_name", "email", "telephone")
+VENDOR_SEARCH_FIELDS = ("shop_name", "shop_owner_name", "email")
+UMBRELLA_SEARCH_FIELDS = ("code",)
+
+GRAM = 3
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(value: Any) -> str:
+    if value is None:
+        return ""
+    return _SPACES.sub(" ", str(value)).strip().lower()
+
+
+def trigrams(text: str) -> List[str]:
+    return sorted({text[i:i + GRAM] for i in range(len(text) - GRAM + 1)})
+
+
+def search_doc(doc: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """The `search` sub-document for `doc`."""
+    out: Dict[str, Any] = {f: normalize(doc.get(f)) for f in fields}
+    grams = set()
+    for f in fields:
+        grams.update(trigrams(out[f]))
+    out["grams"] = sorted(grams)
+    return out
+
+
+def search_filter(q: str, fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Filter equivalent to a case-insensitive substring match of `q` on any of `fields`
+    (trigram-narrowed for 3+ characters, an index-key scan below that).
+    """
+    nq = normalize(q)
+    if not nq:
+        return {}
+    pattern = re.escape(nq)
+    if len(nq) < GRAM:
+        # e.g. "12" must still find UMB-000123, so this can't be prefix-anchored
+        return {"$or": [{f"search.{f}": {"$regex": pattern}} for f in fields]}
+    return {
+        "search.grams": {"$all": trigrams(nq)},
+        "$or": [{f"search.{f}": {"$regex": pattern}} for f in fields],
+    }
+
+
+def search_indexes(fields: Sequence[str]) -> List[IndexModel]:
+    return [IndexModel([(f"search.{f}", ASCENDING)]) for f in fields] + [
+        IndexModel([("search.grams", ASCENDING)])
+    ]
@@ -2,9 +2,15 @@
 
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from jose import jwt, JWTError
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import time
+import uuid
 from core.config import settings
+from utils.ttl_cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -14,14 +20,87 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# ---------- async password work (bcrypt off the event loop) ----------
+
+class PasswordPoolBusy(RuntimeError):
+    """Too many password hashes are already queued; callers should answer 503."""
+
+_PASSWORD_POOL = ThreadPoolExecutor(
+    max_workers=settings.password_workers,
+    thread_name_prefix="password",
+)
+_PASSWORD_PENDING = 0
+_PASSWORD_STATS = {
+    "completed": 0,
+    "rejected": 0,
+    "hash_ms_total": 0.0,
+    "hash_ms_max": 0.0,
+    "wait_ms_total": 0.0,
+    "peak_pending": 0,
+}
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000.0
+
+async def _run_password_work(fn, *args):
+    global _PASSWORD_PENDING
+    if _PASSWORD_PENDING >= settings.password_max_pending:
+        _PASSWORD_STATS["rejected"] += 1
+        raise PasswordPoolBusy("password hashing queue is full")
+
+    _PASSWORD_PENDING += 1
+    _PASSWORD_STATS["peak_pending"] = max(_PASSWORD_STATS["peak_pending"], _PASSWORD_PENDING)
+    t0 = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result, hash_ms = await loop.run_in_executor(_PASSWORD_POOL, _timed, fn, *args)
+    finally:
+        _PASSWORD_PENDING -= 1
+
+    total_ms = (time.perf_counter() - t0) * 1000.0
+    _PASSWORD_STATS["completed"] += 1
+    _PASSWORD_STATS["hash_ms_total"] += hash_ms
+    _PASSWORD_STATS["hash_ms_max"] = max(_PASSWORD_STATS["hash_ms_max"], hash_ms)
+    _PASSWORD_STATS["wait_ms_total"] += max(0.0, total_ms - hash_ms)
+    return result
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_work(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_work(verify_password, plain_password, hashed_password)
+
+def password_pool_stats() -> Dict[str, float]:
+    out = dict(_PASSWORD_STATS)
+    done = out["completed"]
+    out["hash_ms_avg"] = round(out["hash_ms_total"] / done, 2) if done else 0.0
+    out["wait_ms_avg"] = round(out["wait_ms_total"] / done, 2) if done else 0.0
+    out["pending"] = _PASSWORD_PENDING
+    out["queued"] = max(0, _PASSWORD_PENDING - settings.password_workers)
+    out["workers"] = settings.password_workers
+    out["max_pending"] = settings.password_max_pending
+    return out
+
+def shutdown_password_pool() -> None:
+    _PASSWORD_POOL.shutdown(wait=False, cancel_futures=True)
+
+# ---------- JWT ----------
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Refresh tokens always carry a `jti` (generated unless supplied in `data`)."""
     to_encode = data.copy()
+    to_encode.setdefault("jti", new_token_id())
     expire = datetime.utcnow() + (expires_delta or timedelta(days=settings.refresh_token_expire_days))
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
@@ -32,3 +111,31 @@ def decode_token(token: str) -> dict:
     except JWTError:
         raise
     return payload
+
+# Verified claims keyed by token digest; each entry expires at the token's own `exp`.
+_TOKEN_CACHE = TTLCache(maxsize=settings.token_cache_size, ttl=60)
+_TOKEN_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def decode_token_cached(token: str) -> dict:
+    """
+    decode_token() with a bounded cache of already-verified claims.
+    Only successfully verified tokens are cached, and never past their `exp`.
+    The returned dict is shared between callers: treat it as read-only.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _TOKEN_CACHE.get(key)
+    if claims is not None:
+        _TOKEN_CACHE_STATS["hits"] += 1
+        return claims
+
+    _TOKEN_CACHE_STATS["misses"] += 1
+    claims = decode_token(token)
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            _TOKEN_CACHE.set(key, claims, ttl=remaining)
+    return claims
+
+def token_cache_stats() -> Dict[str, int]:
+    return {**_TOKEN_CACHE_STATS, "size": len(_TOKEN_CACHE), "evictions": _TOKEN_CACHE.evictions}
@@ -1,7 +1,12 @@
+import asyncio
+import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from datetime import datetime
-from typing import Tuple
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 from pymongo import ReturnDocument
+from core.config import settings
+
+logger = logging.getLogger(__name__)
 
 COUNTERS_COLL = "counters"
 
@@ -20,5 +25,69 @@ async def next_seq_block(db: AsyncIOMotorDatabase, name: str, count: int) -> Tup
     start = end - count + 1
     return start, end
 
+
+class SequenceAllocator:
+    """
+    Hands out numbers of a named sequence from a block reserved per worker, so
+    most calls cost no round trip and workers don't contend on the counter doc.
+
+    Numbers are unique but not contiguous across workers, and a worker that
+    dies loses the rest of its block (gaps are fine for codes and rental ids).
+    """
+
+    def __init__(self, name: str, block_size: Optional[int] = None):
+        self.name = name
+        self.block_size = block_size or settings.sequence_block_size
+        self._next = 1
+        self._end = 0  # inclusive; _next > _end means nothing reserved
+        self._lock = asyncio.Lock()
+
+    async def next(self, db: AsyncIOMotorDatabase) -> int:
+        return (await self.take(db, 1))[0]
+
+    async def take(self, db: AsyncIOMotorDatabase, count: int) -> List[int]:
+        """`count` numbers, ascending; reserves a new block (at least `count` long) when this one runs out."""
+        out: List[int] = []
+        async with self._lock:
+            while len(out) < count:
+                if self._next > self._end:
+                    self._next, self._end = await next_seq_block(
+                        db, self.name, max(self.block_size, count - len(out))
+                    )
+                n = min(count - len(out), self._end - self._next + 1)
+                out.extend(range(self._next, self._next + n))
+                self._next += n
+        return out
+
+    async def release(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Hand the unused rest of the block back, if nobody reserved after it
+        (the counter still ends at our block); otherwise it simply stays a gap.
+        """
+        async with self._lock:
+            if self._next <= self._end:
+                await db[COUNTERS_COLL].update_one(
+                    {"_id": self.name, "seq": self._end},
+                    {"$set": {"seq": self._next - 1}},
+                )
+            self._next, self._end = 1, 0
+
+
+UMBRELLA_CODES = SequenceAllocator("umbrellas")
+RENTAL_IDS = SequenceAllocator("rentals")
+
+async def release_sequences(db: AsyncIOMotorDatabase) -> None:
+    """Shutdown hook: return unused numbers of every allocator."""
+    for allocator in (UMBRELLA_CODES, RENTAL_IDS):
+        try:
+            await allocator.release(db)
+        except Exception:
+            logger.warning("Could not release %s sequence block", allocator.name, exc_info=True)
+
 def format_umbrella_code(seq: int) -> str:
     return f"UMB-{seq:06d}"
+
+def format_rental_id(seq: int, when: Optional[datetime] = None) -> str:
+    # Example: RENT-20250101-0000042 (7 digits: never clashes with the old 6-hex-char ids)
+    ts = (when or datetime.now(timezone.utc)).strftime("%Y%m%d")
+    return f"RENT-{ts}-{seq:07d}"
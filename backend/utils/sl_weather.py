@@ -1,36 +1,174 @@
-import time, aiohttp
-from typing import Dict, Tuple
+import asyncio, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from utils.ttl_cache import TTLCache
+from utils.weather_providers import WeatherProvider, provider_from_settings
 
 
-_CACHE: Dict[Tuple[int,int], Tuple[float, Dict[str, float]]] = {}
 TTL_SECONDS = 10 * 60  # 10 minutes
+# After TTL, keep serving the old reading for this long while it is refreshed in the background
+STALE_SECONDS = 5 * 60
+# Hard cap on distinct buckets kept in memory (random coordinates just churn the LRU).
+# A reading is a few floats, so this is cheap; the prewarm job fills at most
+# PREWARM_MAX_BUCKETS of it and leaves the rest for ad-hoc lookups.
+MAX_BUCKETS = 8192
+PREWARM_MAX_BUCKETS = MAX_BUCKETS // 2
+
+# bucket -> (fetched_at monotonic, weather)
+_CACHE = TTLCache(maxsize=MAX_BUCKETS, ttl=TTL_SECONDS + STALE_SECONDS)
+
+# Where readings come from (live API, or an offline stand-in for load tests)
+_PROVIDER: Optional[WeatherProvider] = None
+
+# bucket -> in-flight upstream fetch, so concurrent misses share one request
+_INFLIGHT: Dict[Tuple[int,int], "asyncio.Task[Dict[str, float]]"] = {}
+
+_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "coalesced": 0,
+    "stale_hits": 0,
+    "background_refreshes": 0,
+    "upstream_calls": 0,
+    "upstream_errors": 0,
+    "upstream_ms_total": 0.0,
+    "upstream_ms_max": 0.0,
+}
 
 def _bucket(lat: float, lng: float) -> Tuple[int,int]:
     # ~1 km buckets in Sri Lanka; avoids hammering the API
     return (int(lat * 100), int(lng * 100))
 
+def bucket_of(lat: float, lng: float) -> Tuple[int,int]:
+    """The weather bucket a point falls in (what readings, prices and quotes are keyed by)."""
+    return _bucket(lat, lng)
+
+def get_weather_provider() -> WeatherProvider:
+    global _PROVIDER
+    if _PROVIDER is None:
+        _PROVIDER = provider_from_settings()
+    return _PROVIDER
+
+async def set_weather_provider(provider: WeatherProvider) -> None:
+    """Swap the provider (closing the old one) and drop cached readings."""
+    global _PROVIDER
+    if _PROVIDER is not None:
+        await _PROVIDER.close()
+    _PROVIDER = provider
+    reset_weather_cache()
+    await provider.open()
+
+async def open_weather_provider() -> None:
+    await get_weather_provider().open()
+
+async def close_weather_provider() -> None:
+    if _PROVIDER is not None:
+        await _PROVIDER.close()
+
+def reset_weather_cache() -> None:
+    """Forget cached readings and zero the counters (in-flight fetches are left alone)."""
+    _CACHE.clear()
+    _CACHE.evictions = 0
+    for k in _STATS:
+        _STATS[k] = 0.0 if isinstance(_STATS[k], float) else 0
+
+def weather_stats() -> Dict[str, Any]:
+    """Snapshot of cache / upstream counters."""
+    out = dict(_STATS)
+    calls = out["upstream_calls"]
+    out["upstream_ms_avg"] = round(out["upstream_ms_total"] / calls, 2) if calls else 0.0
+    out["cached_buckets"] = len(_CACHE)
+    out["evictions"] = _CACHE.evictions
+    out["inflight"] = len(_INFLIGHT)
+    out["provider"] = get_weather_provider().name
+    return out
+
+async def _fetch_upstream(lat: float, lng: float) -> Dict[str, float]:
+    provider = get_weather_provider()
+    started = time.perf_counter()
+    _STATS["upstream_calls"] += 1
+    try:
+        return await provider.fetch(lat, lng)
+    except Exception:
+        _STATS["upstream_errors"] += 1
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        _STATS["upstream_ms_total"] += elapsed_ms
+        _STATS["upstream_ms_max"] = max(_STATS["upstream_ms_max"], elapsed_ms)
+
+async def _refresh(key: Tuple[int,int], lat: float, lng: float) -> Dict[str, float]:
+    try:
+        out = await _fetch_upstream(lat, lng)
+        _CACHE.set(key, (time.monotonic(), out))
+        return out
+    finally:
+        _INFLIGHT.pop(key, None)
+
+def _consume_error(task: "asyncio.Task") -> None:
+    # background refreshes may have no awaiter; keep asyncio from logging "never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+def _start_refresh(key: Tuple[int,int], lat: float, lng: float) -> "asyncio.Task[Dict[str, float]]":
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_refresh(key, lat, lng))
+        task.add_done_callback(_consume_error)
+        _INFLIGHT[key] = task
+    return task
+
+def bucket_age(key: Tuple[int,int]) -> Optional[float]:
+    """Seconds since the bucket was last fetched, or None if it is not cached."""
+    entry = _CACHE.get(key)
+    return None if entry is None else time.monotonic() - entry[0]
+
+async def refresh_bucket(lat: float, lng: float) -> Dict[str, float]:
+    """Fetch now (joining any in-flight fetch for the same bucket) and store the result."""
+    return await asyncio.shield(_start_refresh(_bucket(lat, lng), lat, lng))
+
 async def get_sl_weather(lat: float, lng: float) -> Dict[str, float]:
     key = _bucket(lat, lng)
-    now = time.time()
-    if key in _CACHE and now - _CACHE[key][0] < TTL_SECONDS:
-        return _CACHE[key][1]
-
-    url = (
-        "https://api.open-meteo.com/v1/forecast"
-        f"?latitude={lat}&longitude={lng}"
-        "&current=precipitation,precipitation_probability,wind_speed_10m"
-        "&forecast_days=1"
-    )
-    async with aiohttp.ClientSession() as s:
-        async with s.get(url, timeout=8) as r:
-            r.raise_for_status()
-            data = await r.json()
-
-    cur = data.get("current") or {}
-    out = {
-        "precip_prob": float(cur.get("precipitation_probability", 0.0)),  # %
-        "precip_mm":   float(cur.get("precipitation", 0.0)),              # mm
-        "wind_kmh":    float(cur.get("wind_speed_10m", 0.0)),             # km/h
-    }
-    _CACHE[key] = (now, out)
-    return out
+    entry = _CACHE.get(key)
+    if entry is not None:
+        fetched_at, data = entry
+        if time.monotonic() - fetched_at < TTL_SECONDS:
+            _STATS["hits"] += 1
+            return data
+        # stale-while-revalidate: answer now, refresh once in the background
+        _STATS["stale_hits"] += 1
+        if key not in _INFLIGHT:
+            _STATS["background_refreshes"] += 1
+            _start_refresh(key, lat, lng)
+        return data
+
+    if key in _INFLIGHT:
+        _STATS["coalesced"] += 1
+    else:
+        _STATS["misses"] += 1
+    task = _start_refresh(key, lat, lng)
+    # shield: one caller disconnecting must not cancel the fetch the others wait on
+    return await asyncio.shield(task)
+
+async def get_sl_weather_many(
+    points: Sequence[Tuple[float, float]],
+    concurrency: int = 16,
+) -> Dict[Tuple[int,int], Union[Dict[str, float], Exception]]:
+    """
+    Weather for many (lat, lng) points, keyed by bucket_of.
+    Each distinct bucket is looked up once; missing buckets are fetched concurrently
+    (bounded by `concurrency`). A failed bucket maps to its exception.
+    """
+    first: Dict[Tuple[int,int], Tuple[float, float]] = {}
+    for lat, lng in points:
+        first.setdefault(_bucket(lat, lng), (lat, lng))
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(lat: float, lng: float) -> Dict[str, float]:
+        async with sem:
+            return await get_sl_weather(lat, lng)
+
+    keys: List[Tuple[int,int]] = list(first)
+    results = await asyncio.gather(*(_one(*first[k]) for k in keys), return_exceptions=True)
+    return dict(zip(keys, results))
@@ -0,0 +1,79 @@
+# utils/token_revocation.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import settings
+from crud.refresh_tokens import list_revoked_since
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL_SECONDS = 30
+# overlap between syncs so revocations committed around the boundary are not missed
+SYNC_OVERLAP_SECONDS = 5
+
+# jti -> token expiry (epoch seconds). Holds explicit revocations only (logout,
+# reuse-detected families); normal rotation is enforced by the store itself.
+_REVOKED: Dict[str, float] = {}
+_LAST_SYNC: Optional[datetime] = None
+
+
+def is_revoked(jti: str) -> bool:
+    exp = _REVOKED.get(jti)
+    if exp is None:
+        return False
+    if exp <= time.time():
+        _REVOKED.pop(jti, None)
+        return False
+    return True
+
+
+def mark_revoked(jti: str, exp: float) -> None:
+    _REVOKED[jti] = float(exp)
+
+
+def _prune() -> None:
+    now = time.time()
+    for jti in [j for j, exp in _REVOKED.items() if exp <= now]:
+        del _REVOKED[jti]
+
+
+async def sync_revocations(db: AsyncIOMotorDatabase) -> int:
+    """Pull revocations recorded since the last sync (by any worker) into memory."""
+    global _LAST_SYNC
+    now = datetime.now(timezone.utc)
+    since = (
+        _LAST_SYNC - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        if _LAST_SYNC
+        else now - timedelta(days=settings.refresh_token_expire_days)
+    )
+    docs = await list_revoked_since(db, since)
+    for d in docs:
+        exp = d.get("expires_at")
+        if exp is not None:
+            if exp.tzinfo is None:
+                exp = exp.replace(tzinfo=timezone.utc)
+            mark_revoked(d["jti"], exp.timestamp())
+    _prune()
+    _LAST_SYNC = now
+    return len(docs)
+
+
+async def run_revocation_sync_loop(db: AsyncIOMotorDatabase, interval: float = SYNC_INTERVAL_SECONDS) -> None:
+    """Lifespan background task; runs until cancelled."""
+    while True:
+        try:
+            await sync_revocations(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("refresh-token revocation sync failed")
+        await asyncio.sleep(interval)
+
+
+def revocation_stats() -> Dict[str, object]:
+    return {"revoked_cached": len(_REVOKED), "last_sync": _LAST_SYNC}
@@ -0,0 +1,87 @@
+# utils/weather_prewarm.py
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from crud.rentals import list_vendors_with_locations
+from utils.sl_weather import PREWARM_MAX_BUCKETS, TTL_SECONDS, bucket_age, bucket_of, refresh_bucket
+
+logger = logging.getLogger(__name__)
+
+PREWARM_INTERVAL_SECONDS = 60
+# refresh a bucket once it is this close to expiring
+REFRESH_LEAD_SECONDS = 2 * PREWARM_INTERVAL_SECONDS
+PREWARM_CONCURRENCY = 8
+MAX_VENDORS = 20000
+
+
+async def prewarm_vendor_buckets(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    """
+    One pass: dedupe vendor locations into weather buckets and refresh every
+    bucket that is missing or about to expire, at most PREWARM_CONCURRENCY at a time.
+    At most PREWARM_MAX_BUCKETS buckets are kept warm (those with the most
+    vendors), so one pass can never evict its own readings from the cache.
+    """
+    vendors = await list_vendors_with_locations(
+        db, limit=MAX_VENDORS, projection={"_id": 0, "location.coordinates": 1}
+    )
+
+    # bucket -> representative (lat, lng); GeoJSON is [lng, lat]
+    points: Dict[Tuple[int, int], Tuple[float, float]] = {}
+    shops: Counter = Counter()
+    for v in vendors:
+        lng, lat = v["location"]["coordinates"][:2]
+        key = bucket_of(lat, lng)
+        points.setdefault(key, (float(lat), float(lng)))
+        shops[key] += 1
+
+    skipped = max(0, len(points) - PREWARM_MAX_BUCKETS)
+    if skipped:
+        logger.warning(
+            "weather prewarm: %d vendor buckets, only the %d busiest are kept warm",
+            len(points), PREWARM_MAX_BUCKETS,
+        )
+        points = {key: points[key] for key, _ in shops.most_common(PREWARM_MAX_BUCKETS)}
+
+    due = []
+    for key, latlng in points.items():
+        age = bucket_age(key)
+        if age is None or age >= TTL_SECONDS - REFRESH_LEAD_SECONDS:
+            due.append(latlng)
+
+    sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def _one(lat: float, lng: float) -> bool:
+        async with sem:
+            try:
+                await refresh_bucket(lat, lng)
+                return True
+            except Exception as e:
+                logger.warning("weather prewarm failed for (%s, %s): %s", lat, lng, e)
+                return False
+
+    results = await asyncio.gather(*(_one(lat, lng) for lat, lng in due))
+    refreshed = sum(results)
+    return {
+        "vendors": len(vendors),
+        "buckets": len(points),
+        "skipped": skipped,
+        "refreshed": refreshed,
+        "failed": len(due) - refreshed,
+    }
+
+
+async def run_prewarm_loop(db: AsyncIOMotorDatabase, interval: float = PREWARM_INTERVAL_SECONDS) -> None:
+    """Lifespan background task; runs until cancelled."""
+    while True:
+        try:
+            stats = await prewarm_vendor_buckets(db)
+            logger.debug("weather prewarm: %s", stats)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("weather prewarm pass failed")
+        await asyncio.sleep(interval)
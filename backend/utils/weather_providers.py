@@ -0,0 +1,171 @@
+# utils/weather_providers.py
+import asyncio
+import hashlib
+import json
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from core.config import settings
+
+Weather = Dict[str, float]
+
+
+class WeatherProvider(ABC):
+    """
+    Source of current weather for a point. get_sl_weather owns caching,
+    coalescing and counters; a provider only answers one upstream fetch.
+    """
+    name = "base"
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def fetch(self, lat: float, lng: float) -> Weather:
+        """{precip_prob, precip_mm, wind_kmh} for the point; raise on failure."""
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """api.open-meteo.com over one pooled keep-alive session; optionally records responses."""
+    name = "open-meteo"
+
+    POOL_LIMIT = 32
+    KEEPALIVE_SECONDS = 60
+    REQUEST_TIMEOUT_SECONDS = 8
+
+    def __init__(self, record_file: Optional[str] = None):
+        self.record_file = record_file
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.POOL_LIMIT,
+                keepalive_timeout=self.KEEPALIVE_SECONDS,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT_SECONDS),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(self, lat: float, lng: float) -> Weather:
+        url = (
+            "https://api.open-meteo.com/v1/forecast"
+            f"?latitude={lat}&longitude={lng}"
+            "&current=precipitation,precipitation_probability,wind_speed_10m"
+            "&forecast_days=1"
+        )
+        await self.open()
+        async with self._session.get(url) as r:
+            r.raise_for_status()
+            data = await r.json()
+
+        cur = data.get("current") or {}
+        out = {
+            "precip_prob": float(cur.get("precipitation_probability", 0.0)),  # %
+            "precip_mm":   float(cur.get("precipitation", 0.0)),              # mm
+            "wind_kmh":    float(cur.get("wind_speed_10m", 0.0)),             # km/h
+        }
+        if self.record_file:
+            with open(self.record_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"lat": lat, "lng": lng, **out}) + "\n")
+        return out
+
+
+class LocalWeatherProvider(WeatherProvider):
+    """
+    Offline, deterministic stand-in for load tests and CI.
+
+    - Readings come from `replay_file` (NDJSON lines of {"lat","lng","precip_prob",
+      "precip_mm","wind_kmh"}, e.g. written by OpenMeteoProvider(record_file=...)),
+      matched by weather bucket; buckets not in the file get a reading derived from `seed`.
+    - `latency_ms` ± `jitter_ms` is slept before answering; `error_rate` of calls raise.
+      Both draw from an RNG seeded with `seed`, so a run is reproducible.
+    """
+    name = "local"
+
+    def __init__(
+        self,
+        seed: int = 0,
+        replay_file: Optional[str] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+    ):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._replay: Dict[Tuple[int, int], Weather] = {}
+        if replay_file:
+            self._replay = self._load(replay_file)
+
+    @staticmethod
+    def _key(lat: float, lng: float) -> Tuple[int, int]:
+        # same cells as sl_weather._bucket
+        return (int(lat * 100), int(lng * 100))
+
+    def _load(self, path: str) -> Dict[Tuple[int, int], Weather]:
+        out: Dict[Tuple[int, int], Weather] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                out[self._key(rec["lat"], rec["lng"])] = {
+                    "precip_prob": float(rec.get("precip_prob", 0.0)),
+                    "precip_mm": float(rec.get("precip_mm", 0.0)),
+                    "wind_kmh": float(rec.get("wind_kmh", 0.0)),
+                }
+        return out
+
+    def _synthetic(self, key: Tuple[int, int]) -> Weather:
+        digest = hashlib.sha256(f"{self.seed}:{key[0]}:{key[1]}".encode()).digest()
+        rnd = random.Random(digest)
+        return {
+            "precip_prob": float(rnd.randrange(0, 101)),
+            "precip_mm": round(rnd.uniform(0.0, 8.0), 1),
+            "wind_kmh": round(rnd.uniform(0.0, 60.0), 1),
+        }
+
+    async def fetch(self, lat: float, lng: float) -> Weather:
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise RuntimeError("injected weather provider failure")
+
+        key = self._key(lat, lng)
+        reading = self._replay.get(key) or self._synthetic(key)
+        return dict(reading)
+
+
+def provider_from_settings() -> WeatherProvider:
+    kind = (settings.weather_provider or "open-meteo").strip().lower()
+    if kind == "local":
+        return LocalWeatherProvider(
+            seed=settings.weather_seed,
+            replay_file=settings.weather_replay_file,
+            latency_ms=settings.weather_latency_ms,
+            jitter_ms=settings.weather_jitter_ms,
+            error_rate=settings.weather_error_rate,
+        )
+    if kind == "open-meteo":
+        return OpenMeteoProvider(record_file=settings.weather_record_file)
+    raise ValueError(f"Unknown WEATHER_PROVIDER: {settings.weather_provider!r}")